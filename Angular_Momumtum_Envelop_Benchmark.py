@@ -0,0 +1,295 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Base settings of every benchmark case; the cases override the grid parameters
+BASE_SETTINGS = {
+    "Skew Angle": 53.13,
+    "Max. Angular Momemtum per CMG": 1,
+    "No. of Delta H Segment": 2,
+    "No. of Delta Theta Segment": 20,
+    "Cluster Combination": "pyr",
+    "Cluster Style": "conv",
+    "Speed Type": "CS",
+    "Wrap Shape N_theta": 9,
+    "Wrap Shape N_phi": 15
+}
+
+# (Cluster Combination, Speed Type, theta segments, H segments) series per profile;
+# one series is one scaling curve
+PROFILES = {
+    'smoke': {
+        'simulators': [
+            ('adj', 'CS', [200, 400], [2]),
+            ('adj', 'VS', [20, 40], [10]),
+            ('pyr', 'CS', [20, 30], [2]),
+            ('pyr', 'VS', [5, 6], [4]),
+            ('3RW', 'CS', [20], [40, 80]),
+            ('4RW', 'CS', [20], [10, 16])
+        ],
+        'backends': ['batched', 'tables'],
+        'point_cloud': [10**6],
+        'wrap_bins': [(9, 15), (18, 30), (36, 60)]
+    },
+    'full': {
+        'simulators': [
+            ('adj', 'CS', [250, 500, 1000, 2000], [2]),
+            ('adj', 'VS', [20, 40, 80], [10, 20]),
+            ('pyr', 'CS', [20, 30, 40, 50], [2]),
+            ('pyr', 'VS', [5, 7, 9], [4, 6]),
+            ('3RW', 'CS', [20], [50, 100, 200]),
+            ('4RW', 'CS', [20], [10, 20, 30])
+        ],
+        'backends': ['batched', 'tables'],
+        'point_cloud': [10**6, 10**7],
+        'wrap_bins': [(9, 15), (18, 30), (36, 60), (90, 180)]
+    }
+}
+
+
+# Fresh-interpreter startup cases: what a short-lived sweep or pool worker pays before its first point
+STARTUP_CASES = [
+    ('python + numpy', "import numpy"),
+    ('toolkit import', "import Angular_Momumtum_Envelop_Toolkit"),
+    ('toolkit + first worker task',
+     "from Angular_Momumtum_Envelop_Toolkit import extent_reducer, profile_forming\n"
+     "reducer = extent_reducer()\n"
+     "for chunk in profile_forming(SETTINGS).stream(progress=False):\n"
+     "    reducer.update(chunk)"),
+    ('toolkit + plotting stack (eager)',
+     "import matplotlib.pyplot, mpl_toolkits.mplot3d, scipy.spatial, scipy.stats, tqdm\n"
+     "import Angular_Momumtum_Envelop_Toolkit")
+]
+
+# Modules reported as loaded by a startup case
+HEAVY_MODULES = ('matplotlib', 'scipy', 'tqdm')
+
+
+def benchmark_cases(profile):
+    """
+    Expand a profile into its list of benchmark cases.
+
+    Returns:
+    - cases: list of dicts with a 'name', a 'kind' ('simulator' or 'process_point_cloud') and its parameters
+    """
+    spec = PROFILES[profile]
+    cases = []
+
+    for combination, speed, theta_segments, h_segments in spec['simulators']:
+        for d_theta in theta_segments:
+            for d_H in h_segments:
+                for backend in spec['backends']:
+                    # The default backend keeps the plain case name, so older baselines still compare
+                    suffix = '' if backend == 'batched' else f" [{backend}]"
+                    cases.append({
+                        'name': f"{combination}_{speed} theta={d_theta} H={d_H}{suffix}",
+                        'kind': 'simulator',
+                        'settings': dict(BASE_SETTINGS, **{
+                            'Cluster Combination': combination,
+                            'Speed Type': speed,
+                            'No. of Delta Theta Segment': d_theta,
+                            'No. of Delta H Segment': d_H,
+                            'Backend': backend
+                        })
+                    })
+
+    for n_points in spec['point_cloud']:
+        for n_theta, n_phi in spec['wrap_bins']:
+            cases.append({
+                'name': f"process_point_cloud N={n_points} bins={n_theta}x{n_phi}",
+                'kind': 'process_point_cloud',
+                'points': n_points,
+                'settings': dict(BASE_SETTINGS, **{'Wrap Shape N_theta': n_theta, 'Wrap Shape N_phi': n_phi})
+            })
+
+    return cases
+
+
+def run_case(case, repeat=3, min_time=0.5):
+    """
+    Run one benchmark case. Meant to run in a fresh process so that the peak
+    RSS belongs to this case only. The case is repeated at least `repeat` times
+    and for at least `min_time` seconds, and the fastest run is kept.
+
+    Returns:
+    - result: dict with the case name, points, wall time, points/s and peak RSS
+    """
+    os.environ['TQDM_DISABLE'] = '1'
+    from Angular_Momumtum_Envelop_Toolkit import dia_calculator, profile_forming
+
+    if case['kind'] == 'simulator':
+        calculation = profile_forming(case['settings'])
+
+        def run():
+            return calculation.simulation()[0].shape[1]
+
+    else:
+        points = np.random.default_rng(0).normal(size=(3, case['points']))
+        calculator = dia_calculator(case['settings'])
+
+        def run():
+            calculator.process_point_cloud(points)
+            return points.shape[1]
+
+    wall, total, runs = float('inf'), 0.0, 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while runs < repeat or total < min_time:
+            start = time.perf_counter()
+            n_points = run()
+            elapsed = time.perf_counter() - start
+            wall, total, runs = min(wall, elapsed), total + elapsed, runs + 1
+
+    # ru_maxrss is in kB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    return {
+        'name': case['name'],
+        'kind': case['kind'],
+        'points': int(n_points),
+        'runs': runs,
+        'wall_s': wall,
+        'points_per_s': n_points / wall if wall > 0 else float('inf'),
+        'peak_rss_mb': peak_rss
+    }
+
+
+def run_startup(repeat=10):
+    """
+    Time every startup case in fresh interpreters, as seen from the parent
+    process (interpreter start, imports and the case itself).
+
+    Returns:
+    - results: list of dicts with the case name, best wall time and the heavy modules it loaded
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, TQDM_DISABLE='1')
+    settings = dict(BASE_SETTINGS, **{'Cluster Combination': 'adj', 'No. of Delta Theta Segment': 40})
+    results = []
+
+    for name, code in STARTUP_CASES:
+        script = (f"SETTINGS = {settings!r}\n{code}\n"
+                  f"import sys; print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+
+        wall = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', script], cwd=here, env=env, check=True,
+                                    capture_output=True, text=True).stdout
+            wall = min(wall, time.perf_counter() - start)
+
+        loaded = output.strip().splitlines()[-1] if output.strip() else ''
+        results.append({'name': name, 'wall_s': wall, 'loaded': loaded.split(',') if loaded else []})
+        print(f"{name:<36} {1000 * wall:>9.1f} ms   loaded: {loaded or '-'}")
+
+    return results
+
+
+def run_benchmark(profile, repeat=3, min_time=0.5):
+    """
+    Run every case of a profile, each in its own process.
+
+    Returns:
+    - report: dict with the profile, machine description and per-case results
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    for case in benchmark_cases(profile):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_case, case, repeat, min_time).result()
+        results.append(result)
+        print(f"{result['name']:<48} {result['points']:>12,d} pts {result['wall_s']:>9.3f} s "
+              f"{result['points_per_s']:>14,.0f} pts/s {result['peak_rss_mb']:>9.1f} MB")
+
+    return {
+        'profile': profile,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+
+
+def compare(report, baseline, threshold=0.2):
+    """
+    Flag cases whose throughput dropped by more than `threshold` relative to a baseline report.
+
+    Returns:
+    - regressions: list of (name, baseline points/s, current points/s)
+    """
+    reference = {result['name']: result for result in baseline['results']}
+    regressions = []
+
+    for result in report['results']:
+        if result['name'] not in reference:
+            continue
+        before = reference[result['name']]['points_per_s']
+        if result['points_per_s'] < (1 - threshold) * before:
+            regressions.append((result['name'], before, result['points_per_s']))
+
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Throughput benchmarks of the simulators and the inscribed-sphere binning.')
+    parser.add_argument('--profile', default='smoke', choices=sorted(PROFILES),
+                        help='smoke: quick PR check, full: scaling curves')
+    parser.add_argument('--repeat', type=int, default=3, help='Min. runs per case, the fastest is kept')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Min. total time per case (s)')
+    parser.add_argument('--out', default='bench_output.json', help='JSON report')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='Baseline JSON report to flag regressions against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative throughput drop flagged as regression')
+    parser.add_argument('--startup', action='store_true',
+                        help='Time fresh-interpreter startup (imports) instead')
+    args = parser.parse_args()
+
+    print('')
+    if args.startup:
+        report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'startup': run_startup(max(args.repeat, 10))}
+        with open(args.out, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=4)
+        print('')
+        print(f"Results written to {args.out}")
+        return
+
+    report = run_benchmark(args.profile, args.repeat, args.min_time)
+
+    with open(args.out, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4)
+    print('')
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as file:
+            regressions = compare(report, json.load(file), args.threshold)
+
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:,.0f} -> {after:,.0f} pts/s")
+
+        if regressions:
+            sys.exit(1)
+        print('No regressions.')
+
+
+if __name__ == '__main__':
+    main()
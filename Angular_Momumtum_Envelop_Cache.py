@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import Angular_Momumtum_Envelop_Toolkit as toolkit
+from Angular_Momumtum_Envelop_Toolkit import RUNTIME_SETTINGS, profile_forming
+
+# Settings of the grid that a finer cached grid can serve coarser: the momentum levels
+# linspace(0, max_H, d_H) nest, while of two gimbal angle grids linspace(0, 360 - 360/d, d - 1)
+# neither contains the other, so 'No. of Delta Theta Segment' must match
+GRID_SETTINGS = ('No. of Delta H Segment',)
+
+# Settings of the (theta, phi) bins, recomputed whenever a cached grid is subsampled
+BIN_SETTINGS = ('Wrap Shape N_theta', 'Wrap Shape N_phi')
+
+
+def code_version():
+    """
+    Returns:
+    - version: Short hash of the toolkit source, so results from older code are not reused
+    """
+    with open(toolkit.__file__, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()[:16]
+
+
+class result_cache:
+    """
+    Content-addressed on-disk cache of simulation results.
+
+    Every entry is a folder named after a hash of the settings and the code
+    version, holding points.npy, R_set.npy and meta.json (settings, extents,
+    radius, size and last use). Arrays are loaded memory-mapped, so a hit costs
+    no copy. The total size is capped and the least recently used entries are
+    evicted first.
+    """
+
+    def __init__(self, directory='.envelope_cache', max_bytes=2 * 2**30):
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Build the cache configured by the 'Cache Directory' and 'Cache Size Limit (MB)'
+        settings. Returns None when 'Cache Directory' is set to null or "".
+        """
+        directory = settings.get('Cache Directory', '.envelope_cache')
+        if not directory:
+            return None
+
+        return cls(directory, int(settings.get('Cache Size Limit (MB)', 2048) * 2**20))
+
+    def key(self, settings):
+        """
+        Returns:
+        - key: Hash of the result-relevant settings and the code version
+        """
+        relevant = {name: value for name, value in settings.items() if name not in RUNTIME_SETTINGS}
+        content = json.dumps([relevant, self.version], sort_keys=True)
+
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+
+    def load(self, settings):
+        """
+        Look up the result of a simulation.
+
+        An exact hit returns memory-mapped arrays. Otherwise, a cached run of the
+        same configuration and gimbal angles with more momentum levels that contain
+        every requested one is subsampled (or the same grid binned with other
+        'Wrap Shape' settings); its extents and R_set are then recomputed from the
+        subsampled points.
+
+        Returns:
+        - result: dict with 'points', 'R_set', 'extents' and 'radius', or None on a miss
+        """
+        entry = os.path.join(self.directory, self.key(settings))
+
+        if os.path.isdir(entry):
+            meta = self._touch(entry)
+            return {
+                'points': np.load(os.path.join(entry, 'points.npy'), mmap_mode='r'),
+                'R_set': np.load(os.path.join(entry, 'R_set.npy'), mmap_mode='r'),
+                'extents': tuple(meta['extents']),
+                'radius': meta['radius']
+            }
+
+        return self._load_subgrid(settings)
+
+    def store(self, settings, points, extents, R_set, radius):
+        """
+        Save a simulation result and evict least recently used entries beyond the size cap.
+        """
+        key = self.key(settings)
+        entry = os.path.join(self.directory, key)
+        size = points.nbytes + np.asarray(R_set).nbytes
+
+        if os.path.isdir(entry) or size > self.max_bytes:
+            return
+
+        # Write into a temporary folder first so that a killed run never leaves a partial entry
+        staging = os.path.join(self.directory, f'.{key}.{os.getpid()}')
+        os.makedirs(staging, exist_ok=True)
+        np.save(os.path.join(staging, 'points.npy'), np.ascontiguousarray(points))
+        np.save(os.path.join(staging, 'R_set.npy'), np.asarray(R_set))
+
+        meta = {
+            'settings': settings,
+            'version': self.version,
+            'extents': [float(value) for value in extents],
+            'radius': float(radius),
+            'bytes': size,
+            'last_used': time.time()
+        }
+        _write_meta(os.path.join(staging, 'meta.json'), meta)
+
+        os.replace(staging, entry)
+        self.evict(keep=key)
+
+    def entries(self):
+        """
+        Returns:
+        - entries: list of (key, meta) of every complete cache entry
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            meta_path = os.path.join(self.directory, key, 'meta.json')
+            if not key.startswith('.') and os.path.isfile(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as file:
+                    entries.append((key, json.load(file)))
+
+        return entries
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1]['last_used'])
+        total = sum(meta['bytes'] for _, meta in entries)
+
+        for key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= meta['bytes']
+
+    def _touch(self, entry):
+        # Record the use of an entry for LRU eviction
+        meta_path = os.path.join(entry, 'meta.json')
+        with open(meta_path, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+
+        meta['last_used'] = time.time()
+        _write_meta(meta_path, meta)
+
+        return meta
+
+    def _load_subgrid(self, settings):
+        # Find a cached finer grid of the same configuration that contains the requested grid
+        if settings.get('Sampling', 'grid') != 'grid':
+            return None
+
+        ignored = RUNTIME_SETTINGS + GRID_SETTINGS + BIN_SETTINGS
+        requested = {name: value for name, value in settings.items() if name not in ignored}
+        axes, _ = profile_forming(settings).state_space()
+
+        for key, meta in self.entries():
+            cached = {name: value for name, value in meta['settings'].items() if name not in ignored}
+            if meta['version'] != self.version or cached != requested:
+                continue
+
+            cached_axes, _ = profile_forming(meta['settings']).state_space()
+            index = [_subset_index(axis, cached_axis) for axis, cached_axis in zip(axes, cached_axes)]
+            if any(sub is None for sub in index):
+                continue
+
+            self._touch(os.path.join(self.directory, key))
+            cached_points = np.load(os.path.join(self.directory, key, 'points.npy'), mmap_mode='r')
+            shape = tuple(len(axis) for axis in cached_axes)
+            points = cached_points.reshape((3,) + shape)[(slice(None),) + np.ix_(*index)].reshape(3, -1)
+
+            reducer = toolkit.envelope_reducer(toolkit.dia_calculator(settings))
+            reducer.update(points)
+
+            return {
+                'points': points,
+                'R_set': reducer.envelope(),
+                'extents': tuple(np.max(points, axis=1)),
+                'radius': reducer.radius()
+            }
+
+        return None
+
+
+def _write_meta(path, meta):
+    # Write meta.json through a temporary file, so that a concurrent reader never sees it truncated
+    staging = f'{path}.{os.getpid()}.tmp'
+    with open(staging, 'w', encoding='utf-8') as file:
+        json.dump(meta, file, indent=4)
+    os.replace(staging, path)
+
+
+def _subset_index(values, cached_values, tol=1e-9):
+    # Indices of values within cached_values, or None if any value is missing
+    values = np.asarray(values, dtype=float)
+    cached_values = np.asarray(cached_values, dtype=float)
+
+    index = np.argmin(np.abs(cached_values[:, None] - values[None, :]), axis=0)
+    if np.any(np.abs(cached_values[index] - values) > tol * np.maximum(1, np.abs(values))):
+        return None
+
+    return index
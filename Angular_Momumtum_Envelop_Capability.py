@@ -0,0 +1,246 @@
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy.spatial import ConvexHull, cKDTree
+
+from Angular_Momumtum_Envelop_Hull import hull_envelope
+from Angular_Momumtum_Envelop_Support import support_engine
+from Angular_Momumtum_Envelop_Toolkit import fibonacci_sphere, profile_forming, settings_from_json
+
+
+class capability_table:
+    """
+    Max. angular momentum per direction on a Fibonacci sphere grid.
+
+    kind 'radial' stores the length of the longest momentum vector along each
+    direction u (the distance from the origin to the envelope surface along u),
+    kind 'support' the largest momentum component along u. Directions between
+    grid nodes are answered by inverse-distance interpolation of the k nearest
+    nodes. Only the values are stored; the grid is rebuilt from its size.
+    """
+
+    def __init__(self, values, kind='radial', meta=None):
+
+        self.values = np.asarray(values, dtype=float) # one value per Fibonacci direction
+        self.kind = kind
+        self.meta = {} if meta is None else meta       # settings and source of the table
+
+        self.directions = fibonacci_sphere(len(self.values))
+        self.tree = cKDTree(self.directions.T)
+
+    @classmethod
+    def build(cls, settings=None, n_directions=4096, source='hull', kind='radial'):
+        """
+        Build the table of a cluster.
+
+        Parameters:
+        - settings: Settings dict (default: Settings.json)
+        - n_directions: Number of grid directions
+        - source: 'hull' (Minkowski-sum hull), 'grid' (convex hull of the simulated
+          point cloud) or 'support' (analytic support function)
+        - kind: 'radial' or 'support'
+
+        Returns:
+        - table: capability_table
+        """
+        settings = settings_from_json() if settings is None else settings
+        directions = fibonacci_sphere(n_directions)
+
+        if source == 'support' and kind == 'support':
+            values = support_engine(settings).support(directions)
+
+        else:
+            vertices, equations = envelope_geometry(settings, source, n_directions)
+            if kind == 'radial':
+                values = radial_function(equations, directions)
+            else:
+                values = support_function(vertices, directions)
+
+        return cls(values, kind, {'settings': settings, 'source': source})
+
+    def query(self, directions, k=4):
+        """
+        Max. angular momentum along a batch of directions.
+
+        Parameters:
+        - directions: 3xN array of direction vectors (normalized here)
+        - k: Number of grid nodes interpolated
+
+        Returns:
+        - h_max: Length-N array
+        """
+        directions = np.asarray(directions, dtype=float)
+        directions = directions / np.linalg.norm(directions, axis=0)
+
+        distance, index = self.tree.query(directions.T, k=k)
+        if k == 1:
+            return self.values[index]
+
+        # Inverse-distance weights; a direction on a node takes the node value
+        weights = 1 / np.maximum(distance, 1e-12)**2
+        return (weights * self.values[index]).sum(axis=1) / weights.sum(axis=1)
+
+    def save(self, path):
+        """
+        Save the table as a compressed .npz file (float32 values).
+        """
+        np.savez_compressed(path, values=self.values.astype(np.float32), kind=self.kind,
+                            meta=json.dumps(self.meta))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Returns:
+        - table: capability_table read from a file written by save()
+        """
+        with np.load(path) as data:
+            return cls(data['values'].astype(float), str(data['kind']), json.loads(str(data['meta'])))
+
+
+def envelope_geometry(settings, source='hull', n_directions=4096):
+    """
+    Convex envelope of a cluster as hull vertices and facet planes.
+
+    Parameters:
+    - settings: Settings dict
+    - source: 'hull', 'grid' or 'support' (tangent planes of the support function
+      on 4 * n_directions directions, no vertices)
+
+    Returns:
+    - vertices: 3xV array, or None for 'support'
+    - equations: Fx4 array of facet planes, n.x + offset <= 0 inside
+    """
+    if source == 'hull':
+        hull = hull_envelope(settings)
+        return hull.vertices, hull.equations
+
+    elif source == 'grid':
+        points = profile_forming(settings).simulation()[0]
+        hull = ConvexHull(points.T)
+        return hull.points[hull.vertices].T, hull.equations
+
+    elif source == 'support':
+        normals = fibonacci_sphere(4 * n_directions)
+        offsets = -support_engine(settings).support(normals)
+        return None, np.column_stack([normals.T, offsets])
+
+    raise ValueError('Setting Error. Please select a proper table source (hull, grid or support).')
+
+
+def radial_function(equations, directions, chunk=4096):
+    """
+    Distance from the origin to a convex envelope along every direction.
+
+    Parameters:
+    - equations: Fx4 array of facet planes, n.x + offset <= 0 inside
+    - directions: 3xM array of unit vectors
+
+    Returns:
+    - r: Length-M array
+    """
+    normals, offsets = equations[:, :3], equations[:, 3]
+    r = np.empty(directions.shape[1])
+
+    for start in range(0, directions.shape[1], chunk):
+        dots = normals @ directions[:, start:start + chunk]
+        with np.errstate(divide='ignore'):
+            hits = np.where(dots > 0, -offsets[:, None] / dots, np.inf)
+        r[start:start + chunk] = hits.min(axis=0)
+
+    return r
+
+
+def support_function(vertices, directions, chunk=4096):
+    """
+    Largest component along every direction over the hull vertices.
+
+    Parameters:
+    - vertices: 3xV array
+    - directions: 3xM array of unit vectors
+
+    Returns:
+    - h: Length-M array
+    """
+    h = np.empty(directions.shape[1])
+
+    for start in range(0, directions.shape[1], chunk):
+        h[start:start + chunk] = (vertices.T @ directions[:, start:start + chunk]).max(axis=0)
+
+    return h
+
+
+def accuracy_report(table, points, n_test=100000, seed=0):
+    """
+    Compare a table with the exact values of a full point cloud on random directions.
+
+    Parameters:
+    - table: capability_table
+    - points: 3xN point cloud of the same cluster
+    - n_test: Number of random test directions
+
+    Returns:
+    - report: dict with the max./mean absolute and relative errors and the query time per direction (us)
+    """
+    directions = np.random.default_rng(seed).normal(size=(3, n_test))
+    directions /= np.linalg.norm(directions, axis=0)
+
+    hull = ConvexHull(np.asarray(points).T)
+    if table.kind == 'radial':
+        exact = radial_function(hull.equations, directions)
+    else:
+        exact = support_function(hull.points[hull.vertices].T, directions)
+
+    start = time.perf_counter()
+    answer = table.query(directions)
+    elapsed = time.perf_counter() - start
+
+    error = np.abs(answer - exact)
+
+    return {
+        'max_abs_error': float(error.max()),
+        'mean_abs_error': float(error.mean()),
+        'max_rel_error': float((error / exact).max()),
+        'mean_rel_error': float((error / exact).mean()),
+        'query_us': 1e6 * elapsed / n_test
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Directional capability lookup table.')
+    parser.add_argument('--out', default='capability.npz', help='Table file to build')
+    parser.add_argument('--directions', type=int, default=4096, help='Number of grid directions')
+    parser.add_argument('--source', default='hull', choices=['hull', 'grid', 'support'])
+    parser.add_argument('--kind', default='radial', choices=['radial', 'support'])
+    parser.add_argument('--check', action='store_true', help='Report the accuracy against the full point cloud')
+    parser.add_argument('--query', nargs=3, type=float, metavar=('X', 'Y', 'Z'),
+                        help='Query a direction in --out')
+    args = parser.parse_args()
+
+    if args.query:
+        table = capability_table.load(args.out)
+        h_max = table.query(np.array(args.query)[:, None])[0]
+        x, y, z = args.query
+        print(f"Max. angular momentum ({table.kind}) along [{x:g}, {y:g}, {z:g}]: {h_max:.4e}")
+        return
+
+    settings = settings_from_json()
+    table = capability_table.build(settings, args.directions, args.source, args.kind)
+    table.save(args.out)
+
+    print('')
+    print(f"{args.directions} directions ({args.kind}, from {args.source}) written to {args.out}")
+
+    if args.check:
+        report = accuracy_report(table, profile_forming(settings).simulation()[0])
+        print('')
+        print(f"Max. error:  {report['max_abs_error']:.4e} ({100 * report['max_rel_error']:.3f} %)")
+        print(f"Mean error:  {report['mean_abs_error']:.4e} ({100 * report['mean_rel_error']:.3f} %)")
+        print(f"Query time:  {report['query_us']:.3f} us per direction")
+    print('')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import csv
+import itertools
+import time
+
+import numpy as np
+
+from Angular_Momumtum_Envelop_Toolkit import (DEFAULT_CHUNK_POINTS, dia_calculator, envelope_reducer,
+                                              extent_reducer, profile_forming, settings_from_json, table_sum,
+                                              tqdm)
+
+# Columns of the scenario table
+COLUMNS = ['failed', 'healthy', 'xdim', 'ydim', 'zdim', 'radius', 'radius_ratio', 'points', 'runtime_s']
+
+# Max. number of points of a materialized partial sum shared between scenarios
+PARTIAL_POINTS = 2**22
+
+
+def subset_settings(settings, healthy):
+    """
+    Settings of the degraded cluster made of the healthy actuators only, as a
+    'custom' cluster, e.g. for an individual run of one scenario.
+
+    Parameters:
+    - settings: Settings dict of the full cluster
+    - healthy: Indices of the remaining actuators
+
+    Returns:
+    - settings: Settings dict of the degraded cluster
+    """
+    cluster = profile_forming(settings).cluster()
+    actuators = []
+
+    for index in healthy:
+        unit = cluster.actuators[index]
+        entry = {'Type': unit.kind, 'Reference': unit.ref.tolist(), 'Max. Angular Momemtum': unit.max_H,
+                 'Lock Angle': unit.lock_angle}
+        if unit.gimbal is not None:
+            entry['Gimbal Axis'] = unit.gimbal.tolist()
+        actuators.append(entry)
+
+    return dict(settings, **{'Cluster Combination': 'custom', 'Actuators': actuators})
+
+
+class failure_scenarios:
+    """
+    Envelopes of a cluster with every subset of up to max_failed actuators
+    failed (a failed actuator contributes no momentum), in one batched job.
+
+    The momentum of every actuator is tabulated once over its own states
+    (cluster_engine.tables), and the partial sums of the healthy actuators are
+    shared between the scenarios: e.g. with CMG #4 or CMG #3 failed, the pyramid
+    scenarios (1, 2, 3) and (1, 2, 4) both start from the table of 1 + 2, which
+    is also the envelope of the pair (1, 2). Every scenario is streamed through
+    table_sum into the extent and envelope reducers, in actuator order, so its
+    points are the same as those of an individual run of the degraded cluster.
+    """
+
+    def __init__(self, settings=None, max_failed=2):
+
+        # Initialize parameters
+        self.settings = settings_from_json() if settings is None else settings
+        self.calculation = profile_forming(self.settings)
+        self.calculation.setup_grid()
+        self.cluster = self.calculation.cluster()
+        self.max_failed = max_failed
+
+        self.tables = self.cluster.tables(self.calculation.theta, self.calculation.d_H)
+        self.partials = {} # healthy prefix -> 3xn table of its momentum sum
+
+    def scenarios(self):
+        """
+        Returns:
+        - scenarios: list of (failed, healthy) index tuples, the nominal cluster first,
+          then by number of failed actuators; at least one actuator stays healthy
+        """
+        n = len(self.tables)
+        scenarios = []
+
+        for n_failed in range(0, min(self.max_failed, n - 1) + 1):
+            for failed in itertools.combinations(range(n), n_failed):
+                scenarios.append((failed, tuple(index for index in range(n) if index not in failed)))
+
+        return scenarios
+
+    def partial(self, prefix):
+        """
+        Momentum table of the first actuators of a scenario, built from the
+        shared table of the prefix one actuator shorter.
+
+        Returns:
+        - table: 3xn array, or None when it exceeds PARTIAL_POINTS
+        """
+        if len(prefix) == 1:
+            return self.tables[prefix[0]]
+
+        if prefix not in self.partials:
+            size = int(np.prod([self.tables[index].shape[1] for index in prefix], dtype=np.int64))
+            shorter = self.partial(prefix[:-1]) if size <= PARTIAL_POINTS else None
+            self.partials[prefix] = None if shorter is None else table_sum([shorter, self.tables[prefix[-1]]])
+
+        return self.partials[prefix]
+
+    def run_scenario(self, healthy, chunk_points=None):
+        """
+        Stream one scenario into the extent and envelope reducers.
+
+        Returns:
+        - extents, envelope: The updated extent_reducer and envelope_reducer
+        """
+        chunk_points = chunk_points or DEFAULT_CHUNK_POINTS
+
+        # Longest shared partial sum of the healthy actuators, then the remaining tables
+        length = len(healthy)
+        while length > 1 and self.partial(healthy[:length]) is None:
+            length -= 1
+        tables = [self.partial(healthy[:length])] + [self.tables[index] for index in healthy[length:]]
+
+        total = int(np.prod([table.shape[1] for table in tables], dtype=np.int64))
+        extents, envelope = extent_reducer(), envelope_reducer(dia_calculator(self.settings))
+
+        for first in range(0, total, chunk_points):
+            chunk = table_sum(tables, first, min(first + chunk_points, total), chunk_points=chunk_points)
+            extents.update(chunk)
+            envelope.update(chunk)
+
+        return extents, envelope
+
+    def spans_3d(self, healthy):
+        """
+        Returns:
+        - spans: Whether the momentum directions of the healthy actuators (both
+          axes of the momentum circle of a CMG, the spin axis of a wheel) span 3D
+        """
+        directions = []
+        for index in healthy:
+            unit = self.cluster.actuators[index]
+            directions += [unit.direction()] if unit.kind == 'RW' else [unit.ref, unit.quad]
+
+        return np.linalg.matrix_rank(np.array(directions), tol=1e-9) == 3
+
+    def run(self, chunk_points=None, progress=True):
+        """
+        Run every scenario.
+
+        Returns:
+        - rows: list of dicts with the COLUMNS of the scenario table (actuators numbered from 1)
+        """
+        rows = []
+
+        scenarios = self.scenarios()
+        for failed, healthy in tqdm(scenarios, desc="Processing failure scenarios", disable=not progress):
+            start = time.perf_counter()
+            extents, envelope = self.run_scenario(healthy, chunk_points)
+            xdim, ydim, zdim = extents.extents()
+
+            # Momentum confined to a plane or a line leaves no 3-axis capability, whatever the bins say
+            radius = envelope.radius() if self.spans_3d(healthy) else 0.0
+
+            rows.append({
+                'failed': ' '.join(str(index + 1) for index in failed) or '-',
+                'healthy': ' '.join(str(index + 1) for index in healthy),
+                'xdim': xdim,
+                'ydim': ydim,
+                'zdim': zdim,
+                'radius': radius,
+                'points': extents.count,
+                'runtime_s': time.perf_counter() - start
+            })
+
+        # Inscribed radius relative to the nominal cluster
+        nominal = rows[0]['radius']
+        for row in rows:
+            row['radius_ratio'] = row['radius'] / nominal if nominal > 0 else np.nan
+
+        return rows
+
+
+def individual_runs(settings, scenarios, chunk_points=None):
+    """
+    Reference timing: run every scenario on its own, as a 'custom' cluster
+    streamed through profile_forming.
+
+    Returns:
+    - rows: list of (radius, extents, runtime_s) per scenario
+    """
+    rows = []
+
+    for _, healthy in tqdm(scenarios, desc="Processing individual runs"):
+        start = time.perf_counter()
+        degraded = subset_settings(settings, healthy)
+        extents, envelope = extent_reducer(), envelope_reducer(dia_calculator(degraded))
+        for chunk in profile_forming(degraded).stream(chunk_points, progress=False):
+            extents.update(chunk)
+            envelope.update(chunk)
+        rows.append((envelope.radius(), extents.extents(), time.perf_counter() - start))
+
+    return rows
+
+
+def print_table(rows):
+    # Comparison table of the scenarios
+    print('')
+    print(f"{'Failed':<8} {'Healthy':<10} {'X (Nms)':>11} {'Y (Nms)':>11} {'Z (Nms)':>11} {'Radius':>11} "
+          f"{'vs nominal':>10} {'Points':>14}")
+    for row in rows:
+        print(f"{row['failed']:<8} {row['healthy']:<10} "
+              f"{row['xdim']:>11.4e} {row['ydim']:>11.4e} {row['zdim']:>11.4e} "
+              f"{row['radius']:>11.4e} {100 * row['radius_ratio']:>9.1f}% {row['points']:>14,d}")
+    print('')
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Envelopes of the Settings.json cluster with failed actuators.')
+    parser.add_argument('--comb', default=None, choices=['adj', 'pyr', '3RW', '4RW', 'custom'],
+                        help='Cluster Combination (default: Settings.json)')
+    parser.add_argument('--max-failed', type=int, default=2,
+                        help='Max. number of failed actuators per scenario')
+    parser.add_argument('--out', default=None, help='Also write the table to a .csv file')
+    parser.add_argument('--individual', action='store_true',
+                        help='Also run every scenario on its own and compare the runtimes')
+    args = parser.parse_args()
+
+    settings = settings_from_json()
+    if args.comb:
+        settings['Cluster Combination'] = args.comb
+
+    batch = failure_scenarios(settings, args.max_failed)
+
+    start = time.perf_counter()
+    rows = batch.run()
+    elapsed = time.perf_counter() - start
+
+    print_table(rows)
+    print(f"{len(rows)} scenarios in {elapsed:.2f} s")
+
+    if args.individual:
+        reference = individual_runs(settings, batch.scenarios())
+        same = all((radius == row['radius'] or not batch.spans_3d(healthy))
+                   and extents == (row['xdim'], row['ydim'], row['zdim'])
+                   for (radius, extents, _), row, (_, healthy) in zip(reference, rows, batch.scenarios()))
+        individual = sum(runtime for _, _, runtime in reference)
+        print(f"Individual runs: {individual:.2f} s ({individual / elapsed:.1f}x the batch), "
+              f"{'same' if same else 'different'} extents and radii")
+
+    if args.out:
+        with open(args.out, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"Table written to {args.out}")
+    print('')
+
+
+if __name__ == '__main__':
+    main()
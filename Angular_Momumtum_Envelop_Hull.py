@@ -0,0 +1,131 @@
+import numpy as np
+from scipy.spatial import ConvexHull
+
+from Angular_Momumtum_Envelop_Toolkit import (facet_inscribed_sphere, profile_forming, settings_from_json,
+                                              state_grid)
+
+
+class hull_envelope:
+    """
+    Convex envelope of the angular momentum set, built as a Minkowski sum.
+
+    The total momentum is the sum of independent per-actuator contributions, so
+    the convex hull of the full N_theta^k point cloud equals the Minkowski sum of
+    the per-actuator hulls. The sum is accumulated one actuator at a time and
+    pruned back to hull vertices after every step, which leaves a mesh of a few
+    thousand vertices instead of the full point cloud.
+    """
+
+    def __init__(self, settings=None, n_gimbal=None):
+        """
+        Parameters:
+        - settings: Settings dict (default: Settings.json)
+        - n_gimbal: Number of gimbal angles sampled per CMG, overriding
+          'No. of Delta Theta Segment' to trade mesh size against accuracy
+        """
+        # Initialize parameters
+        self.settings = settings_from_json() if settings is None else settings
+
+        grid_settings = dict(self.settings)
+        if n_gimbal is not None:
+            grid_settings['No. of Delta Theta Segment'] = n_gimbal + 1
+        self.calculation = profile_forming(grid_settings)
+
+        # Build the envelope
+        self.hull = minkowski_hull(self.actuator_samples())
+
+        self.vertices = self.hull.points[self.hull.vertices].T # 3xV hull vertices
+        self.faces = self.hull.simplices                        # Fx3 triangles (indices into hull.points)
+        self.equations = self.hull.equations                    # Fx4 facet planes, n.x + offset <= 0 inside
+
+    def actuator_samples(self):
+        """
+        Sample the curve (CS CMG), disc (VS CMG) or segment (reaction wheel) of
+        every actuator on the simulator grid, with the other actuators at zero momentum.
+
+        Returns:
+        - samples: list of 3xn arrays, one per actuator
+        """
+        self.calculation.setup_grid()
+        theta, n_h = self.calculation.theta, self.calculation.d_H
+
+        samples = []
+        for unit in self.calculation.cluster().actuators:
+            states = state_grid(*unit.axes(theta, n_h))
+            samples.append(unit.momentum(states.T))
+
+        return samples
+
+    def extents(self):
+        """
+        Returns:
+        - xdim, ydim, zdim: Max. dimension of the envelope along each axis
+        """
+        xdim, ydim, zdim = np.max(self.vertices, axis=1)
+
+        return xdim, ydim, zdim
+
+    def inscribed_radius(self):
+        """
+        Exact radius of the largest origin-centred sphere inside the hull, the
+        minimum origin-to-facet distance.
+
+        Returns:
+        - radius: Inscribed sphere radius
+        - direction: Unit normal of the closest facet
+        """
+        return facet_inscribed_sphere(self.hull)
+
+
+def extreme_points(points, tol=1e-9):
+    """
+    Reduce a point set to the vertices of its convex hull. Flat (2D) and
+    collinear (1D) sets, such as a single CMG circle, are reduced within their
+    own affine span since a 3D hull does not exist for them.
+
+    Parameters:
+    - points: 3xN numpy array
+
+    Returns:
+    - vertices: 3xM numpy array, M <= N
+    """
+    points = np.unique(points.T, axis=0).T
+    if points.shape[1] <= 1:
+        return points
+
+    # Affine dimension of the set
+    centred = points - points.mean(axis=1, keepdims=True)
+    basis, singular_values, _ = np.linalg.svd(centred, full_matrices=False)
+    rank = int(np.sum(singular_values > tol * max(singular_values[0], 1)))
+
+    if rank == 3:
+        return points[:, ConvexHull(points.T).vertices]
+
+    if rank == 2:
+        planar = basis[:, :2].T @ centred
+        return points[:, ConvexHull(planar.T).vertices]
+
+    if rank == 1:
+        line = basis[:, 0] @ centred
+        return points[:, [np.argmin(line), np.argmax(line)]]
+
+    return points[:, :1]
+
+
+def minkowski_hull(point_sets):
+    """
+    Convex hull of the Minkowski sum of several point sets.
+
+    Parameters:
+    - point_sets: list of 3xn numpy arrays
+
+    Returns:
+    - hull: scipy.spatial.ConvexHull of the summed set
+    """
+    total = extreme_points(point_sets[0])
+
+    for points in point_sets[1:]:
+        points = extreme_points(points)
+        total = extreme_points((total[:, :, None] + points[:, None, :]).reshape(3, -1))
+
+    return ConvexHull(total.T)
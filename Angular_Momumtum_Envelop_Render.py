@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Angular_Momumtum_Envelop_Cache import result_cache
+from Angular_Momumtum_Envelop_Hull import hull_envelope
+from Angular_Momumtum_Envelop_Toolkit import (decimate_points, dia_calculator, envelope_result,
+                                              plot_full_envelope, plot_sliced_envelope, profile_forming,
+                                              settings_from_json)
+from Angular_Momumtum_Envelop_Trace import finish_tracing, stage, start_tracing
+
+# File name of every figure in an output folder, and the axis it is sliced on
+FIGURES = {'Full': None, 'X': 'x', 'Y': 'y', 'Z': 'z'}
+
+
+def compute_envelope(settings):
+    """
+    Simulate (or load from the cache) the envelope described by the settings,
+    print its dimensions and inscribed sphere radius, and reduce it for plotting.
+
+    Returns:
+    - envelope: dict with 'result' (envelope_result), 'points' (its 3xN buffer),
+      'extents', 'radius', 'plot_points' (envelope_result of the decimated points), 'distances'
+      and 'mesh' (hull surface, or None)
+    """
+    # Simulation Setup
+    calculation = profile_forming(settings)
+    # 'grid' (full point cloud) or 'hull' (Minkowski-sum mesh)
+    envelope_method = settings.get('Envelope Method', 'grid')
+    cache, cached, mesh = None, None, None
+
+    if envelope_method == 'hull':
+        with stage('hull_envelope') as record:
+            hull = hull_envelope(settings)
+            result = envelope_result(hull.vertices)
+            mesh = (hull.hull.points, hull.faces)
+            record['points'] = len(result)
+
+    else:
+        # Reuse the result of an earlier run with the same settings if there is one
+        with stage('cache_load'):
+            cache = result_cache.from_settings(settings)
+            cached = cache.load(settings) if cache is not None else None
+
+        if cached is not None:
+            result = envelope_result(cached['points']) # a view of the memory-mapped points
+
+        else:
+            with stage('simulation') as record:
+                result = calculation.result()
+                record['points'] = len(result)
+
+    points = result.points
+
+    # Max. Dimension of the Angular Momemtum Envelop
+    xdim, ydim, zdim = result.extents()
+
+    # Print enevelop dimension
+    print('')
+    print(f"X-axis Size for the Angular Momentum Envelope: {xdim:.4e}")
+    print(f"Y-axis Size for the Angular Momentum Envelope: {ydim:.4e}")
+    print(f"Z-axis Size for the Angular Momentum Envelope: {zdim:.4e}")
+    print('')
+
+    # Calculate the diameter of the envelop
+    if envelope_method == 'hull':
+        radius, _ = hull.inscribed_radius()
+        print(f"Radius of the inscribed sphere: {radius:.4e}")
+        print('')
+
+    else:
+        dia_cal = dia_calculator(settings)
+
+        if cached is not None:
+            radius = cached['radius']
+            print(f"Radius of the inscribed sphere: {radius:.4e}")
+            print('')
+
+        else:
+            R_set, radius = dia_cal.process_point_cloud(points)
+
+            if cache is not None:
+                with stage('cache_store'):
+                    cache.store(settings, points, (xdim, ydim, zdim), R_set, radius)
+
+        # Exact radius from the convex hull of the cloud instead of the (theta, phi) bins
+        if settings.get('Inscribed Sphere Method', 'bins') == 'hull':
+            with stage('hull_inscribed_sphere') as record:
+                radius, _ = dia_cal.hull_inscribed_sphere(points)
+                record['points'] = points.shape[1]
+
+    # Reduce the cloud to the plot budget once, shared by all four figures
+    plot_budget = settings.get('Plot Point Budget', 200000)     # None or 0 plots every point
+    plot_decimation = settings.get('Plot Decimation', 'voxel') # 'voxel' or 'angular'
+    with stage('decimate_points') as record:
+        # distances: distance of every kept point to the origin
+        plot_points, distances = decimate_points(points, plot_budget, plot_decimation, result.norms())
+        record['points'] = points.shape[1]
+
+    return {
+        'result': result,
+        'points': points,
+        'extents': (xdim, ydim, zdim),
+        'radius': radius,
+        'plot_points': envelope_result(plot_points),
+        'distances': distances,
+        'mesh': mesh
+    }
+
+
+def build_figure(plt, name, envelope):
+    """
+    Build one of the Full/X/Y/Z figures of an envelope with the given pyplot module.
+    """
+    max_range = np.max(envelope['extents'])
+
+    with stage(f'figure {name}') as record:
+        fig = plt.figure(name, figsize=(10, 8)) # Increase figure size for better spacing
+
+        if FIGURES[name] is None:
+            plot_full_envelope(fig, envelope['plot_points'].points, envelope['distances'], max_range,
+                               envelope['mesh'])
+
+        else:
+            plot_sliced_envelope(fig, FIGURES[name], envelope['plot_points'], envelope['distances'],
+                                 envelope['radius'], envelope['extents'], max_range)
+        record['points'] = len(envelope['plot_points'])
+
+    return fig
+
+
+def render_figure(name, envelope, folder):
+    """
+    Render one figure off-screen (Agg backend) into folder/<name>.png.
+
+    Returns:
+    - elapsed: Render time (s)
+    """
+    start = time.perf_counter()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = build_figure(plt, name, envelope)
+    fig.savefig(os.path.join(folder, f'{name}.png'))
+    plt.close(fig)
+    envelope['plot_points'].close() # a worker's mapping of the shared points, if any
+
+    return time.perf_counter() - start
+
+
+def folder_name(settings):
+    # Same layout as the reference folders, e.g. "1 Nms - CSCMG - PYR"
+    max_H = settings['Max. Angular Momemtum per CMG']
+    combination = settings['Cluster Combination']
+
+    if combination in ('adj', 'pyr'):
+        return f"{max_H:g} Nms - {settings['Speed Type']}CMG - {combination.upper()}"
+
+    return f"{max_H:g} Nms - {combination}"
+
+
+def render_folder(settings, out_root='.', workers=4):
+    """
+    Compute one configuration and write Full.png, X.png, Y.png, Z.png, Print.txt
+    and Settings.json into an output folder laid out like the reference folders.
+    The four figures are rendered concurrently in worker processes.
+
+    Returns:
+    - folder: Path of the output folder
+    - render_times: dict of render time (s) per figure
+    """
+    folder = os.path.join(out_root, folder_name(settings))
+    os.makedirs(folder, exist_ok=True)
+
+    envelope = compute_envelope(settings)
+    xdim, ydim, zdim = envelope['extents']
+
+    # Same bytes as the reference Print.txt files: LF line ends on every platform, none after the last line
+    with open(os.path.join(folder, 'Print.txt'), 'w', encoding='utf-8', newline='\n') as file:
+        file.write(f"X-axis Size for the Angular Momentum Envelope: {xdim:.4e}\n")
+        file.write(f"Y-axis Size for the Angular Momentum Envelope: {ydim:.4e}\n")
+        file.write(f"Z-axis Size for the Angular Momentum Envelope: {zdim:.4e}\n")
+        file.write('\n')
+        file.write(f"Radius of the inscribed sphere: {envelope['radius']:.4e}")
+
+    with open(os.path.join(folder, 'Settings.json'), 'w', encoding='utf-8') as file:
+        json.dump(settings, file, indent=4)
+
+    # Only what the figures need is sent to the workers
+    plot_data = {key: envelope[key] for key in ('plot_points', 'distances', 'extents', 'radius', 'mesh')}
+
+    if workers > 1:
+        # The workers attach to the plot points in shared memory instead of unpickling a copy each
+        plot_data['plot_points'].to_shared()
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(FIGURES))) as pool:
+                futures = {name: pool.submit(render_figure, name, plot_data, folder) for name in FIGURES}
+                render_times = {name: future.result() for name, future in futures.items()}
+        finally:
+            plot_data['plot_points'].close()
+
+    else:
+        render_times = {name: render_figure(name, plot_data, folder) for name in FIGURES}
+
+    for name, elapsed in render_times.items():
+        print(f"Rendered {name}.png in {elapsed:.2f} s")
+    print('')
+
+    return folder, render_times
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Render the envelope figures and prints without a display.')
+    parser.add_argument('settings', nargs='*', default=['Settings.json'],
+                        help='Settings files, one folder each')
+    parser.add_argument('--out-root', default='.', help='Folder the output folders are created in')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes rendering the figures')
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    for path in args.settings:
+        with stage('settings', path=path):
+            with open(path, 'r', encoding='utf-8') as file:
+                settings = json.load(file)
+        start_tracing(settings)
+
+        # Older settings files predate the wrap-shape bins; use the defaults of Settings.json
+        defaults = settings_from_json() if os.path.isfile('Settings.json') else {}
+        settings.setdefault('Wrap Shape N_theta', defaults.get('Wrap Shape N_theta', 9))
+        settings.setdefault('Wrap Shape N_phi', defaults.get('Wrap Shape N_phi', 15))
+
+        folder, _ = render_folder(settings, args.out_root, args.workers)
+        print(f"Written {folder}")
+
+    finish_tracing()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import argparse
+
+import numpy as np
+
+from Angular_Momumtum_Envelop_Toolkit import (DEFAULT_CHUNK_POINTS, decimate_points, grid_states,
+                                              profile_forming, scientific_formatter, settings_from_json, tqdm)
+
+
+class singularity_map:
+    """
+    Near-singular gimbal states of a CMG cluster.
+
+    The torque Jacobian J (3 x n CMGs) of the momentum map loses rank on the
+    singular surfaces. Its smallest singular value, from the eigenvalues of the
+    3x3 (or nxn for fewer than three CMGs) Gram matrix, is evaluated chunk by
+    chunk over the simulator grid, and only the states below the threshold are
+    kept, so memory follows the size of the singular set and not of the grid.
+    """
+
+    def __init__(self, settings=None):
+
+        # Initialize parameters
+        self.settings = settings_from_json() if settings is None else settings
+        self.calculation = profile_forming(self.settings)
+        self.cluster = self.calculation.cluster()
+
+        if not any(unit.kind != 'RW' for unit in self.cluster.actuators):
+            raise ValueError('Setting Error. Singular surfaces need at least one CMG.')
+
+        # Keep states whose smallest singular value is below this fraction of the max. momentum
+        self.threshold = self.settings.get('Singularity Threshold', 0.05) * self.calculation.max_H
+
+    def singular_values(self, states):
+        """
+        Parameters:
+        - states: NxK array of cluster states
+
+        Returns:
+        - sigma: Nxm array of the singular values of J, ascending, m = min(3, n CMGs)
+        """
+        J = self.cluster.jacobian(states)
+        gram = J @ J.transpose(0, 2, 1) if J.shape[2] >= 3 else J.transpose(0, 2, 1) @ J
+
+        return np.sqrt(np.clip(np.linalg.eigvalsh(gram), 0, None))
+
+    def scan(self, threshold=None, chunk_points=None, progress=True):
+        """
+        Stream the simulator grid and keep the near-singular states.
+
+        Parameters:
+        - threshold: Max. smallest singular value kept (Nms/rad, default: 'Singularity Threshold'
+          x max. momentum)
+        - chunk_points: States evaluated per chunk
+
+        Returns:
+        - result: dict with the kept 'states' (NxK), 'points' (3xN), 'sigma' (Nxm),
+          the grid size 'count' and the 'threshold'
+        """
+        threshold = self.threshold if threshold is None else threshold
+        chunk_points = chunk_points or DEFAULT_CHUNK_POINTS
+
+        self.calculation.setup_grid()
+        axes = self.cluster.axes(self.calculation.theta, self.calculation.d_H)
+        axes = [np.asarray(axis, dtype=float) for axis in axes]
+        total = int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+
+        states, points, sigma = [], [], []
+        for first in tqdm(range(0, total, chunk_points), desc=f"Singular states ({self.calculation.clu_comb})",
+                          disable=not progress):
+            chunk = grid_states(axes, first, min(first + chunk_points, total))
+            chunk_sigma = self.singular_values(chunk)
+            keep = chunk_sigma[:, 0] < threshold
+
+            states.append(chunk[keep])
+            points.append(self.cluster.kernel(chunk[keep]))
+            sigma.append(chunk_sigma[keep])
+
+        return {
+            'states': np.concatenate(states),
+            'points': np.concatenate(points, axis=1),
+            'sigma': np.concatenate(sigma),
+            'count': total,
+            'threshold': threshold
+        }
+
+
+def save_singular_states(path, result):
+    """
+    Export a scan result to a .npz file (states, points, sigma) or a .csv file
+    (one row per state: states, x, y, z, smallest singular value).
+    """
+    if path.endswith('.csv'):
+        table = np.column_stack([result['states'], result['points'].T, result['sigma'][:, 0]])
+        header = ','.join([f's{k}' for k in range(result['states'].shape[1])] + ['x', 'y', 'z', 'sigma_min'])
+        np.savetxt(path, table, delimiter=',', header=header, comments='')
+        return
+
+    np.savez_compressed(path, states=result['states'], points=result['points'], sigma=result['sigma'],
+                        count=result['count'], threshold=result['threshold'])
+
+
+def plot_singular_states(fig, result, envelope_points=None, max_range=None):
+    """
+    Draw the near-singular momentum points, coloured by the smallest singular
+    value, over a faint envelope point cloud.
+
+    Parameters:
+        fig: The figure to draw on.
+        result: Output of singularity_map.scan.
+        envelope_points: Optional 3xN envelope points drawn in grey.
+        max_range: Half-width of the 1:1:1 axes box (default: from the points).
+    """
+    ax0 = fig.add_subplot(111, projection='3d')
+
+    if envelope_points is not None:
+        ax0.scatter(*envelope_points, color='grey', edgecolor='none', alpha=0.1, s=1)
+
+    x_plot, y_plot, z_plot = result['points']
+    scatter = ax0.scatter(x_plot, y_plot, z_plot, c=result['sigma'][:, 0], cmap='viridis_r', edgecolor='none',
+                          alpha=0.6, s=4)
+    ax0.set_title("Near-Singular Gimbal States", fontsize=14, pad=20)
+
+    # Set axes labels with additional padding
+    ax0.set_xlabel('X-axis (Nms)', fontsize=12, labelpad=20)
+    ax0.set_ylabel('Y-axis (Nms)', fontsize=12, labelpad=20)
+    ax0.set_zlabel('Z-axis (Nms)', fontsize=12, labelpad=20)
+
+    formatter = scientific_formatter()
+    ax0.xaxis.set_major_formatter(formatter)
+    ax0.yaxis.set_major_formatter(formatter)
+    ax0.zaxis.set_major_formatter(formatter)
+
+    # Keep the scales for three axes to be 1:1:1
+    if max_range is None:
+        reference = result['points'] if envelope_points is None else envelope_points
+        max_range = np.max(np.abs(reference)) if reference.size else 1.0
+    ax0.set_xlim(-max_range, max_range)
+    ax0.set_ylim(-max_range, max_range)
+    ax0.set_zlim(-max_range, max_range)
+    ax0.set_aspect('equal')
+
+    colorbar = fig.colorbar(scatter, ax=ax0, shrink=0.5, aspect=10, pad=0.2)
+    colorbar.set_label('Smallest Singular Value (Nms/rad)', fontsize=12, labelpad=10)
+    colorbar.formatter = formatter
+    colorbar.update_ticks()
+
+    fig.subplots_adjust(left=0.2, right=0.8, top=0.85, bottom=0.15)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description='Map the near-singular gimbal states of the CMG cluster in Settings.json.')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help="Max. smallest singular value as a fraction of the max. momentum "
+                             "(default: 'Singularity Threshold' or 0.05)")
+    parser.add_argument('--out', default='singular_states.npz', help='Export file (.npz or .csv)')
+    parser.add_argument('--plot', default=None,
+                        help='Save a figure of the singular states over the envelope (e.g. singular.png)')
+    args = parser.parse_args()
+
+    settings = settings_from_json()
+    if args.threshold is not None:
+        settings['Singularity Threshold'] = args.threshold
+
+    mapper = singularity_map(settings)
+    result = mapper.scan()
+    save_singular_states(args.out, result)
+
+    print('')
+    print(f"{len(result['states']):,d} of {result['count']:,d} states below {result['threshold']:.4e} Nms/rad "
+          f"written to {args.out}")
+
+    if args.plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+
+        envelope_points, _ = decimate_points(mapper.calculation.simulation()[0],
+                                             settings.get('Plot Point Budget', 200000),
+                                             settings.get('Plot Decimation', 'voxel'))
+        fig = plt.figure('Singular', figsize=(10, 8))
+        plot_singular_states(fig, result, envelope_points)
+        fig.savefig(args.plot)
+        print(f"Figure written to {args.plot}")
+    print('')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import argparse
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+from Angular_Momumtum_Envelop_Toolkit import cluster_engine, fibonacci_sphere, settings_from_json
+
+
+class support_engine:
+    """
+    Analytic support function of the angular momentum envelope.
+
+    Along a unit direction u, a CMG sweeping the circle h * (cos(d) * ref + sin(d) * quad)
+    contributes at most H * sqrt((u.ref)^2 + (u.quad)^2), for constant and variable
+    speed alike, and a reaction wheel spinning about a contributes H * |u.a|. The
+    cluster maximum is the sum of these independent maxima, so no gimbal grid is
+    sampled and the result does not depend on 'No. of Delta Theta Segment'.
+    """
+
+    def __init__(self, settings=None):
+
+        # Initialize parameters
+        self.settings = settings_from_json() if settings is None else settings
+
+        # Extract the setting data
+        self.skew_angle = self.settings['Skew Angle']               # unit: deg
+        self.max_H = self.settings['Max. Angular Momemtum per CMG'] # unit: Nms
+        self.clu_comb = self.settings['Cluster Combination']
+        self.clu_styl = self.settings['Cluster Style']
+
+        # Geometry of the actuators: CMG circles (ref, quad) and reaction wheel spin axes
+        cluster = cluster_engine.from_settings(self.settings)
+        self.ref, self.quad, self.cmg_H, self.wheel_axes, self.wheel_H = cluster.frames()
+
+    def support(self, directions, chunk=2**20):
+        """
+        Evaluate the support function for a batch of directions.
+
+        Parameters:
+        - directions: 3xM array of unit vectors
+        - chunk: Number of directions evaluated at once
+
+        Returns:
+        - h_max: Length-M array, max. angular momentum along each direction
+        """
+        directions = np.asarray(directions, dtype=float)
+        h_max = np.empty(directions.shape[1])
+
+        for start in range(0, directions.shape[1], chunk):
+            u = directions[:, start:start + chunk]
+            value = (self.cmg_H[:, None] * np.sqrt((self.ref @ u)**2 + (self.quad @ u)**2)).sum(axis=0)
+            value += (self.wheel_H[:, None] * np.abs(self.wheel_axes @ u)).sum(axis=0)
+            h_max[start:start + chunk] = value
+
+        return h_max
+
+    def extents(self):
+        """
+        Returns:
+        - xdim, ydim, zdim: Max. dimension of the envelope along each axis
+        """
+        xdim, ydim, zdim = self.support(np.eye(3))
+
+        return xdim, ydim, zdim
+
+    def capability_map(self, n_theta, n_phi):
+        """
+        Directional capability map on a (theta, phi) grid of bin centres,
+        laid out like dia_calculator's R_set.
+
+        Parameters:
+        - n_theta: Number of polar steps over [0, pi]
+        - n_phi: Number of azimuthal steps over [0, 2*pi]
+
+        Returns:
+        - theta, phi: Bin-centre angles (rad)
+        - h_map: n_theta x n_phi array of max. angular momentum per direction
+        """
+        theta = (np.arange(n_theta) + 0.5) * np.pi / n_theta
+        phi = (np.arange(n_phi) + 0.5) * 2 * np.pi / n_phi
+        tt, pp = np.meshgrid(theta, phi, indexing='ij')
+
+        directions = np.array([
+            np.sin(tt) * np.cos(pp),
+            np.sin(tt) * np.sin(pp),
+            np.cos(tt)
+        ]).reshape(3, -1)
+
+        h_map = self.support(directions).reshape(n_theta, n_phi)
+
+        return theta, phi, h_map
+
+    def inscribed_radius(self, n_directions=2**18, n_candidates=8, n_refine=40):
+        """
+        Radius of the largest origin-centred sphere inside the convex envelope,
+        i.e. the minimum of the support function over all directions.
+
+        A Fibonacci lattice locates the candidates, then every candidate is
+        polished by repeatedly sampling a shrinking cap around it.
+
+        Parameters:
+        - n_directions: Size of the initial Fibonacci lattice
+        - n_candidates: Number of lattice minima that are refined
+        - n_refine: Number of cap-shrinking steps per candidate
+
+        Returns:
+        - radius: Inscribed sphere radius
+        - direction: Unit vector along which the radius is attained
+        """
+        directions = fibonacci_sphere(n_directions)
+        h_max = self.support(directions)
+
+        alpha_0 = 2 * np.sqrt(4 * np.pi / n_directions) # ~ two lattice spacings
+        best_radius, best_direction = np.inf, None
+
+        for k in np.argsort(h_max)[:n_candidates]:
+            centre, radius, alpha = directions[:, k], h_max[k], alpha_0
+
+            for _ in range(n_refine):
+                cap = _spherical_cap(centre, alpha)
+                cap_h = self.support(cap)
+                if cap_h.min() < radius:
+                    radius = cap_h.min()
+                    centre = cap[:, np.argmin(cap_h)]
+                alpha *= 0.6
+
+            if radius < best_radius:
+                best_radius, best_direction = radius, centre
+
+        return best_radius, best_direction
+
+
+def _spherical_cap(centre, alpha, n_rings=8, n_ring_points=32):
+    # Directions on rings of angular radius up to alpha around centre (centre included)
+    helper = np.eye(3)[np.argmin(np.abs(centre))]
+    e1 = np.cross(centre, helper)
+    e1 /= np.linalg.norm(e1)
+    e2 = np.cross(centre, e1)
+
+    angle = np.repeat(np.linspace(alpha / n_rings, alpha, n_rings), n_ring_points)
+    psi = np.tile(np.linspace(0, 2 * np.pi, n_ring_points, endpoint=False), n_rings)
+    offset = np.outer(e1, np.cos(psi)) + np.outer(e2, np.sin(psi))
+
+    cap = np.cos(angle) * centre[:, None] + np.sin(angle) * offset
+
+    return np.hstack([centre[:, None], cap])
+
+
+def read_print_file(folder):
+    """
+    Read the printed extents and inscribed radius of a reference folder.
+
+    Returns:
+    - printed: dict with 'xdim', 'ydim', 'zdim' and 'radius'
+    """
+    labels = {
+        'xdim': r'X-axis Size.*?:\s*([-+0-9.eE]+)',
+        'ydim': r'Y-axis Size.*?:\s*([-+0-9.eE]+)',
+        'zdim': r'Z-axis Size.*?:\s*([-+0-9.eE]+)',
+        'radius': r'Radius of the inscribed sphere:\s*([-+0-9.eE]+)'
+    }
+
+    # The print file is called Print.txt or Prints.txt
+    with open(glob.glob(os.path.join(folder, 'Print*.txt'))[0], 'r', encoding='utf-8') as file:
+        text = file.read()
+
+    return {key: float(re.search(pattern, text).group(1)) for key, pattern in labels.items()}
+
+
+def cross_check(folder):
+    """
+    Compare the analytic envelope with the sampled results stored in a reference folder.
+
+    The sampled extent along an axis can only fall short of the analytic one, by at
+    most the factor cos(delta / 2) where delta is the gimbal step of the sampled
+    grid. The sampled radius is a binned estimate of the outer envelope, so it is
+    reported next to the analytic (exact, convex) value rather than bounded.
+
+    Returns:
+    - report: dict with the sampled and analytic values and the extent check result
+    """
+    with open(os.path.join(folder, 'Settings.json'), 'r', encoding='utf-8') as file:
+        settings = json.load(file)
+
+    printed = read_print_file(folder)
+    engine = support_engine(settings)
+    extents = np.array(engine.extents())
+    radius, _ = engine.inscribed_radius()
+
+    # Gimbal step of profile_forming.theta
+    d_theta = settings['No. of Delta Theta Segment']
+    step = np.deg2rad((360 - 360 / d_theta) / (d_theta - 2))
+
+    sampled = np.array([printed['xdim'], printed['ydim'], printed['zdim']])
+    tolerance = 5e-4 * extents # 4 significant digits in the print file
+    lower = extents * np.cos(step / 2) - tolerance
+    extents_ok = bool(np.all((sampled <= extents + tolerance) & (sampled >= lower)))
+
+    return {
+        'folder': os.path.basename(os.path.normpath(folder)),
+        'sampled_extents': sampled,
+        'analytic_extents': extents,
+        'sampled_radius': printed['radius'],
+        'analytic_radius': radius,
+        'extents_ok': extents_ok
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Analytic angular momentum envelope (support function).')
+    parser.add_argument('--check', nargs='*', metavar='FOLDER',
+                        help='Cross-check against reference folders (default: all "1 Nms - *" folders)')
+    args = parser.parse_args()
+
+    if args.check is None:
+        engine = support_engine()
+        xdim, ydim, zdim = engine.extents()
+        radius, direction = engine.inscribed_radius()
+
+        print('')
+        print(f"X-axis Size for the Angular Momentum Envelope: {xdim:.4e}")
+        print(f"Y-axis Size for the Angular Momentum Envelope: {ydim:.4e}")
+        print(f"Z-axis Size for the Angular Momentum Envelope: {zdim:.4e}")
+        print('')
+        print(f"Radius of the inscribed sphere: {radius:.4e}")
+        x, y, z = direction
+        print(f"Direction of the inscribed sphere contact: [{x:.4f}, {y:.4f}, {z:.4f}]")
+        print('')
+        return
+
+    folders = args.check or sorted(glob.glob('1 Nms - *'))
+
+    for folder in folders:
+        report = cross_check(folder)
+        print('')
+        print(f"{report['folder']}: extents {'OK' if report['extents_ok'] else 'MISMATCH'}")
+        for axis, sampled, analytic in zip('XYZ', report['sampled_extents'], report['analytic_extents']):
+            print(f"  {axis}-axis Size: sampled {sampled:.4e}, analytic {analytic:.4e}")
+        print(f"  Inscribed radius: sampled (binned) {report['sampled_radius']:.4e}, "
+              f"analytic {report['analytic_radius']:.4e}")
+
+
+if __name__ == '__main__':
+    main()
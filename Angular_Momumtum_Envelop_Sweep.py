@@ -0,0 +1,237 @@
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from Angular_Momumtum_Envelop_Support import support_engine
+from Angular_Momumtum_Envelop_Toolkit import (dia_calculator, envelope_reducer, extent_reducer, profile_forming,
+                                              settings_from_json, tqdm)
+
+# Columns of the sweep table
+COLUMNS = [
+    'Cluster Combination', 'Cluster Style', 'Speed Type', 'Skew Angle',
+    'xdim', 'ydim', 'zdim', 'radius', 'points', 'runtime_s'
+]
+
+# Sweep parameters the wheel clusters do not depend on
+WHEEL_INDEPENDENT = {
+    '3RW': ('Cluster Style', 'Speed Type', 'Skew Angle'),
+    '4RW': ('Cluster Style', 'Speed Type')
+}
+
+
+def sweep_configurations(base, skews, styles, combinations, speeds):
+    """
+    Expand parameter ranges into one settings dict per configuration.
+
+    Parameters:
+    - base: Settings dict providing every other parameter
+    - skews, styles, combinations, speeds: Values of 'Skew Angle', 'Cluster Style',
+      'Cluster Combination' and 'Speed Type' to combine
+
+    Returns:
+    - configurations: list of settings dicts; a wheel cluster is run once per
+      value of the parameters it depends on (see WHEEL_INDEPENDENT)
+    """
+    if base.get('Checkpoint Directory'):
+        raise ValueError("Setting Error. A sweep cannot share one 'Checkpoint Directory' "
+                         "between its configurations.")
+
+    configurations, seen = [], set()
+    for combination, style, speed, skew in itertools.product(combinations, styles, speeds, skews):
+        parameters = {
+            'Cluster Combination': combination,
+            'Cluster Style': style,
+            'Speed Type': speed,
+            'Skew Angle': float(skew)
+        }
+
+        ignored = WHEEL_INDEPENDENT.get(combination, ())
+        key = tuple(None if name in ignored else value for name, value in parameters.items())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        settings = dict(base)
+        settings.update(parameters)
+        configurations.append(settings)
+
+    return configurations
+
+
+def run_configuration(settings, chunk_points=None):
+    """
+    Run one configuration through profile_forming.simulation into the extent and
+    envelope reducers, so its 'Workers', 'Sampling', 'Backend' and 'Symmetry
+    Reduction' settings apply as in a single run.
+
+    Returns:
+    - row: dict with the COLUMNS of the sweep table
+    """
+    start = time.perf_counter()
+
+    calculation = profile_forming(settings)
+    extents, envelope = extent_reducer(), envelope_reducer(dia_calculator(settings))
+
+    # The tables and progress bars of the run are not part of the sweep output
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        calculation.simulation(reducers=[extents, envelope], chunk_points=chunk_points)
+
+    xdim, ydim, zdim = extents.extents()
+
+    return {
+        'Cluster Combination': settings['Cluster Combination'],
+        'Cluster Style': settings['Cluster Style'],
+        'Speed Type': settings['Speed Type'],
+        'Skew Angle': settings['Skew Angle'],
+        'xdim': xdim,
+        'ydim': ydim,
+        'zdim': zdim,
+        'radius': envelope.radius(),
+        'points': extents.count,
+        'runtime_s': time.perf_counter() - start
+    }
+
+
+def run_sweep(configurations, workers=1):
+    """
+    Run every configuration, across a process pool if workers > 1.
+
+    Returns:
+    - rows: list of result rows, in the order of the configurations
+    """
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_configuration, settings) for settings in configurations]
+            for _ in tqdm(as_completed(futures), total=len(futures), desc="Processing sweep"):
+                pass
+
+            return [future.result() for future in futures]
+
+    return [run_configuration(settings) for settings in tqdm(configurations, desc="Processing sweep")]
+
+
+def write_table(rows, path):
+    """
+    Write the sweep rows to a .csv file, or to a .parquet file when pandas and
+    a parquet engine are installed.
+    """
+    if path.endswith('.parquet'):
+        try:
+            import pandas as pd
+        except ImportError:
+            print('Writing .parquet tables requires pandas (and pyarrow or fastparquet).')
+            raise
+
+        pd.DataFrame(rows, columns=COLUMNS).to_parquet(path, index=False)
+        return
+
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def optimize_skew(base, bounds=(0.0, 90.0), step=1.0, tol=1e-3):
+    """
+    Search the skew angle that maximizes the inscribed sphere radius, using the
+    analytic support function instead of a full grid. A scan with the given step
+    brackets the optimum, then a golden-section search refines it.
+
+    Parameters:
+    - base: Settings dict of the cluster
+    - bounds: Skew angle search range (deg)
+    - step: Scan step (deg)
+    - tol: Final bracket width (deg)
+
+    Returns:
+    - skew: Best skew angle (deg)
+    - radius: Inscribed sphere radius at that skew angle
+    """
+    def radius_at(skew):
+        settings = dict(base)
+        settings['Skew Angle'] = float(skew)
+        return support_engine(settings).inscribed_radius(n_directions=2**14)[0]
+
+    scan = np.arange(bounds[0], bounds[1] + step / 2, step)
+    radii = [radius_at(skew) for skew in tqdm(scan, desc="Scanning skew angle")]
+    best = int(np.argmax(radii))
+
+    # Golden-section search on the bracket around the best scan point
+    low, high = scan[max(best - 1, 0)], scan[min(best + 1, len(scan) - 1)]
+    ratio = (np.sqrt(5) - 1) / 2
+    a, b = high - ratio * (high - low), low + ratio * (high - low)
+    radius_a, radius_b = radius_at(a), radius_at(b)
+
+    while high - low > tol:
+        if radius_a > radius_b:
+            high, b, radius_b = b, a, radius_a
+            a = high - ratio * (high - low)
+            radius_a = radius_at(a)
+        else:
+            low, a, radius_a = a, b, radius_b
+            b = low + ratio * (high - low)
+            radius_b = radius_at(b)
+
+    skew = (low + high) / 2
+    candidates = [(radius_at(skew), skew), (radii[best], scan[best])]
+    radius, skew = max(candidates)
+
+    return skew, radius
+
+
+def parse_range(text):
+    # "40:70:5" -> 40, 45, ..., 70; "53.13" -> 53.13
+    if ':' in text:
+        start, stop, step = (float(value) for value in text.split(':'))
+        return list(np.arange(start, stop + step / 2, step))
+
+    return [float(text)]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Sweep CMG/RW cluster configurations.')
+    parser.add_argument('--skew', nargs='+', default=None, help='Skew angles or ranges start:stop:step (deg)')
+    parser.add_argument('--style', nargs='+', default=None, choices=['conv', 'hans'])
+    parser.add_argument('--comb', nargs='+', default=None, choices=['adj', 'pyr', '3RW', '4RW'])
+    parser.add_argument('--speed', nargs='+', default=None, choices=['CS', 'VS'])
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--out', default='sweep.csv', help='Output table (.csv or .parquet)')
+    parser.add_argument('--optimize', action='store_true',
+                        help='Search the skew angle that maximizes the inscribed radius (analytic fast path)')
+    parser.add_argument('--bounds', nargs=2, type=float, default=[0.0, 90.0], help='Skew search range (deg)')
+    args = parser.parse_args()
+
+    base = settings_from_json()
+
+    skews = [skew for text in args.skew for skew in parse_range(text)] if args.skew else [base['Skew Angle']]
+    styles = args.style or [base['Cluster Style']]
+    combinations = args.comb or [base['Cluster Combination']]
+    speeds = args.speed or [base['Speed Type']]
+
+    if args.optimize:
+        print('')
+        for combination, style in itertools.product(combinations, styles):
+            if 'Cluster Style' in WHEEL_INDEPENDENT.get(combination, ()) and style != styles[0]:
+                continue
+            settings = dict(base, **{'Cluster Combination': combination, 'Cluster Style': style})
+            skew, radius = optimize_skew(settings, tuple(args.bounds))
+            print(f"{combination} / {style}: best Skew Angle {skew:.3f} deg, "
+                  f"radius of the inscribed sphere {radius:.4e}")
+        return
+
+    rows = run_sweep(sweep_configurations(base, skews, styles, combinations, speeds), args.workers)
+    write_table(rows, args.out)
+
+    print('')
+    print(f"{len(rows)} configurations written to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,55 @@
+import hashlib
+import itertools
 import json
+import os
+import pickle
+import time
+import warnings
 
-import matplotlib.pyplot as plt
 import numpy as np
-from mpl_toolkits.mplot3d import Axes3D
-from scipy.spatial import ConvexHull
-from tqdm import tqdm
+
+from Angular_Momumtum_Envelop_Trace import stage
+
+# Compute-only use (workers, sweeps, caches) loads NumPy alone: matplotlib, scipy and
+# tqdm are imported by the functions that need them, on first use
+
+# Default number of states evaluated per chunk in streaming mode
+DEFAULT_CHUNK_POINTS = 2**20
+
+# Settings that do not change the simulated result, ignored by the result cache and when matching a checkpoint
+RUNTIME_SETTINGS = ('Workers', 'Symmetry Reduction', 'Backend', 'Envelope Method', 'Inscribed Sphere Method',
+                    'Cache Directory', 'Cache Size Limit (MB)', 'Checkpoint Directory',
+                    'Checkpoint Interval (s)', 'Checkpoint Points', 'Trace File', 'Trace Memory',
+                    'Trace Profile', 'Plot Point Budget', 'Plot Decimation')
+
+
+def tqdm(iterable=None, **kwargs):
+    # Progress bar, tqdm imported on first use; a disabled bar does not import it at all
+    if kwargs.get('disable'):
+        return _silent_bar(iterable)
+
+    from tqdm import tqdm as progress_bar
+
+    return progress_bar(iterable, **kwargs)
+
+
+class _silent_bar:
+    # Stand-in for a disabled tqdm bar (iteration, context manager and update)
+
+    def __init__(self, iterable=None):
+        self.iterable = iterable
+
+    def __iter__(self):
+        return iter(self.iterable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def update(self, n=1):
+        pass
 
 
 class ang_vec:
@@ -62,6 +107,85 @@ class ang_vec:
 
         return h_total
 
+    def cmg_frames(self, combination):
+        """
+        Unit vectors spanning the momentum circle of every CMG in the cluster,
+        h_i = h * (cos(d_i) * ref_i + sin(d_i) * quad_i), as used in adj_ang_vec / pyr_ang_vec.
+
+        Parameters:
+        - combination: 'adj' (CMG #1 and #4) or 'pyr' (CMG #1 to #4)
+
+        Returns:
+        - ref: nx3 array, momentum direction of each CMG at zero gimbal angle
+        - quad: nx3 array, momentum direction of each CMG at 90 deg gimbal angle
+        """
+        ref = np.array([[0, 1, 0], [-1, 0, 0], [0, -1, 0], [1, 0, 0]], dtype=float)
+        quad = np.array([
+            [-self.cb, 0, self.sb],
+            [0, -self.cb, self.sb],
+            [self.cb, 0, self.sb],
+            [0, self.cb, self.sb]
+        ])
+
+        if combination == 'adj':
+            return ref[[0, 3]], quad[[0, 3]]
+
+        return ref, quad
+
+    def adj_ang_vec_batch(self, states):
+        """
+        Batched version of adj_ang_vec.
+
+        Parameters:
+        - states: Nx4 array, one [d1, h1, d4, h4] state per row
+
+        Returns:
+        - h_total: 3xN array of angular momentum vectors
+        """
+        d1, h1, d4, h4 = np.asarray(states, dtype=float).T
+
+        c1 = np.cos(np.deg2rad(d1))
+        s1 = np.sin(np.deg2rad(d1))
+        c4 = np.cos(np.deg2rad(d4))
+        s4 = np.sin(np.deg2rad(d4))
+
+        h1 = h1 * np.array([-self.cb * s1, c1, self.sb * s1])
+        h4 = h4 * np.array([c4, self.cb * s4, self.sb * s4])
+
+        h_total = h1 + h4
+
+        return h_total
+
+    def pyr_ang_vec_batch(self, states):
+        """
+        Batched version of pyr_ang_vec.
+
+        Parameters:
+        - states: Nx8 array, one [d1, h1, d2, h2, d3, h3, d4, h4] state per row
+
+        Returns:
+        - h_total: 3xN array of angular momentum vectors
+        """
+        d1, h1, d2, h2, d3, h3, d4, h4 = np.asarray(states, dtype=float).T
+
+        c1 = np.cos(np.deg2rad(d1))
+        s1 = np.sin(np.deg2rad(d1))
+        c2 = np.cos(np.deg2rad(d2))
+        s2 = np.sin(np.deg2rad(d2))
+        c3 = np.cos(np.deg2rad(d3))
+        s3 = np.sin(np.deg2rad(d3))
+        c4 = np.cos(np.deg2rad(d4))
+        s4 = np.sin(np.deg2rad(d4))
+
+        h1 = h1 * np.array([-self.cb * s1, c1, self.sb * s1])
+        h2 = h2 * np.array([-c2, -self.cb * s2, self.sb * s2])
+        h3 = h3 * np.array([self.cb * s3, -c3, self.sb * s3])
+        h4 = h4 * np.array([c4, self.cb * s4, self.sb * s4])
+
+        h_total = h1 + h2 + h3 + h4
+
+        return h_total
+
 
 def tri_ang_vec(state):
 
@@ -76,12 +200,634 @@ def tri_ang_vec(state):
     return h_total
 
 
+def tri_ang_vec_batch(states):
+    """
+    Batched version of tri_ang_vec.
+
+    Parameters:
+    - states: Nx3 array, one [h1, h2, h3] state per row
+
+    Returns:
+    - h_total: 3xN array of angular momentum vectors
+    """
+    h1, h2, h3 = np.asarray(states, dtype=float).T
+
+    h1 = h1 * np.array([[1], [0], [0]])
+    h2 = h2 * np.array([[0], [1], [0]])
+    h3 = h3 * np.array([[0], [0], [1]])
+
+    h_total = h1 + h2 + h3
+
+    return h_total
+
+
+def state_grid(*axes):
+    """
+    Build every combination of the given axes, ordered like the nested loops
+    of the simulators (the last axis varies fastest).
+
+    Parameters:
+    - axes: 1D sequences, one per state variable
+
+    Returns:
+    - states: NxK array, one state per row
+    """
+    grids = np.meshgrid(*axes, indexing='ij')
+
+    return np.stack([grid.ravel() for grid in grids], axis=1)
+
+
+class actuator:
+    """
+    One actuator of a cluster.
+
+    - 'CS' / 'VS' CMG: momentum h * (cos(d) * ref + sin(d) * quad), quad = gimbal x ref, sampled
+      over the gimbal grid at h = max_H ('CS') or over the gimbal and momentum grids ('VS')
+    - 'RW' reaction wheel: momentum h * ref for h over [-max_H, max_H]. Given a gimbal axis, the
+      wheel sits on a gimbal locked at lock_angle, as in the 4RW mode.
+    """
+
+    def __init__(self, kind, ref, gimbal=None, max_H=1, lock_angle=90):
+
+        self.kind = kind
+        self.ref = np.asarray(ref, dtype=float) # momentum direction at zero gimbal angle
+        self.gimbal = None if gimbal is None else np.asarray(gimbal, dtype=float) # gimbal axis
+        self.max_H = max_H                      # unit: Nms
+        self.lock_angle = lock_angle            # unit: deg
+
+        if kind not in ('CS', 'VS', 'RW'):
+            raise ValueError('Setting Error. Please select a proper actuator type (CS, VS or RW).')
+
+        if kind in ('CS', 'VS') and self.gimbal is None:
+            raise ValueError('Setting Error. A CMG needs a gimbal axis.')
+
+        if abs(np.linalg.norm(self.ref) - 1) > 1e-9:
+            raise ValueError('Setting Error. The reference direction must be a unit vector.')
+
+        if self.gimbal is not None and (abs(np.linalg.norm(self.gimbal) - 1) > 1e-9
+                                        or abs(self.gimbal @ self.ref) > 1e-9):
+            raise ValueError('Setting Error. The gimbal axis must be a unit vector normal to the '
+                             'reference direction.')
+
+        # Momentum direction at 90 deg
+        self.quad = None if self.gimbal is None else np.cross(self.gimbal, self.ref)
+
+    def axes(self, theta, n_h):
+        """
+        State axes of the actuator, (gimbal angle, momentum) or (momentum,), in nested-loop order.
+
+        Parameters:
+        - theta: Gimbal angle grid (deg)
+        - n_h: Number of momentum levels from 0 to max_H
+        """
+        h = np.linspace(0, self.max_H, n_h)
+
+        if self.kind == 'CS':
+            return [theta, [self.max_H]]
+
+        elif self.kind == 'VS':
+            return [theta, h]
+
+        h_range = np.concatenate([-h, h]) # Combine negative and positive ranges
+
+        if self.gimbal is None:
+            return [h_range]
+
+        return [[self.lock_angle], h_range]
+
+    def bounds(self):
+        """
+        Returns:
+        - bounds: (low, high) range of every state column, for the samplers
+        """
+        if self.kind == 'CS':
+            return [(0, 360), (self.max_H, self.max_H)]
+
+        elif self.kind == 'VS':
+            return [(0, 360), (0, self.max_H)]
+
+        if self.gimbal is None:
+            return [(-self.max_H, self.max_H)]
+
+        return [(self.lock_angle, self.lock_angle), (-self.max_H, self.max_H)]
+
+    def periodic(self):
+        # Whether every state column is a gimbal angle (wraps at 360 deg)
+        if self.kind in ('CS', 'VS'):
+            return [True, False]
+
+        return [False] * len(self.bounds())
+
+    def momentum(self, columns):
+        """
+        Parameters:
+        - columns: The actuator's state columns, (d, h) or (h,), each of length N
+
+        Returns:
+        - h: 3xN array of angular momentum vectors
+        """
+        if self.gimbal is None:
+            h, = columns
+            return h * self.ref[:, None]
+
+        d, h = columns
+        c = np.cos(np.deg2rad(d))
+        s = np.sin(np.deg2rad(d))
+
+        return h * (c * self.ref[:, None] + s * self.quad[:, None])
+
+    def direction(self):
+        # Spin axis of a wheel, including a locked gimbal
+        if self.gimbal is None:
+            return self.ref
+
+        angle = np.deg2rad(self.lock_angle)
+        return np.cos(angle) * self.ref + np.sin(angle) * self.quad
+
+
+class cluster_engine:
+    """
+    Angular momentum of an arbitrary cluster of CMGs and reaction wheels.
+
+    The state of every actuator takes one or two columns of the state array,
+    and the kernel adds the actuators' momenta chunk-wide, so the cost is set by
+    the number of sampled states rather than by the depth of nested loops. The
+    'adj', 'pyr', '3RW' and '4RW' modes are presets with the same state axes and
+    bit-identical points as the ang_vec kernels.
+    """
+
+    def __init__(self, actuators):
+
+        self.actuators = list(actuators)
+
+    @classmethod
+    def preset(cls, combination, style, skew, max_H, speed='CS'):
+        """
+        Build one of the built-in clusters.
+
+        Parameters:
+        - combination: 'adj', 'pyr', '3RW' or '4RW'
+        - style: 'conv' or 'hans' (CMG clusters)
+        - skew: Skew angle (deg)
+        - max_H: Max. angular momentum per actuator (Nms)
+        - speed: 'CS' or 'VS' (CMG clusters)
+        """
+        if combination in ('adj', 'pyr'):
+
+            if speed not in ('CS', 'VS'):
+                raise ValueError('Setting Error. Please select a proper speed type for the inner rotor '
+                                 'of the CMG')
+
+            ref, quad = ang_vec(style, skew).cmg_frames(combination)
+            return cls(actuator(speed, r, np.cross(r, q), max_H) for r, q in zip(ref, quad))
+
+        elif combination == '3RW':
+
+            return cls(actuator('RW', axis, max_H=max_H) for axis in np.eye(3))
+
+        elif combination == '4RW':
+
+            # Hanspeter's pyramid with every gimbal locked at 90 deg
+            ref, quad = ang_vec('hans', skew).cmg_frames('pyr')
+            return cls(actuator('RW', r, np.cross(r, q), max_H) for r, q in zip(ref, quad))
+
+        raise ValueError('Setting Error. Please select a proper Cluster Style.')
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Build the cluster of a settings dict: a preset, or with 'Cluster Combination'
+        set to 'custom', the 'Actuators' list. Every actuator entry has a 'Type'
+        ('CS', 'VS' or 'RW'), a 'Reference' direction, a 'Gimbal Axis' (CMGs, or a
+        wheel on a gimbal locked at 'Lock Angle') and optionally its own
+        'Max. Angular Momemtum'.
+        """
+        max_H = settings['Max. Angular Momemtum per CMG']
+
+        if settings['Cluster Combination'] != 'custom':
+            return cls.preset(settings['Cluster Combination'], settings['Cluster Style'],
+                              settings['Skew Angle'], max_H, settings['Speed Type'])
+
+        return cls(actuator(entry['Type'], entry['Reference'], entry.get('Gimbal Axis'),
+                            entry.get('Max. Angular Momemtum', max_H), entry.get('Lock Angle', 90))
+                   for entry in settings['Actuators'])
+
+    def axes(self, theta, n_h):
+        """
+        Returns:
+        - axes: State axes of every actuator, concatenated in actuator order
+        """
+        return [axis for unit in self.actuators for axis in unit.axes(theta, n_h)]
+
+    def bounds(self):
+        """
+        Returns:
+        - low, high: Length-K arrays, range of every state column
+        """
+        low, high = np.array([bound for unit in self.actuators for bound in unit.bounds()], dtype=float).T
+
+        return low, high
+
+    def periodic(self):
+        """
+        Returns:
+        - periodic: Length-K boolean array, True for gimbal angle columns
+        """
+        return np.array([flag for unit in self.actuators for flag in unit.periodic()])
+
+    def kernel(self, states):
+        """
+        Parameters:
+        - states: NxK array, the actuators' state columns side by side
+
+        Returns:
+        - h_total: 3xN array of angular momentum vectors
+        """
+        states = np.asarray(states, dtype=float)
+        h_total, column = None, 0
+
+        for unit in self.actuators:
+            width = 1 if unit.kind == 'RW' and unit.gimbal is None else 2
+            h = unit.momentum(states[:, column:column + width].T)
+            h_total = h if h_total is None else h_total + h
+            column += width
+
+        return h_total
+
+    def jacobian(self, states):
+        """
+        Torque Jacobian of the momentum map, the derivative of the total momentum
+        with respect to every CMG gimbal angle (wheels have no gimbal rate).
+
+        Parameters:
+        - states: NxK array, the actuators' state columns side by side
+
+        Returns:
+        - J: Nx3xn array (Nms/rad), one column h * (-sin(d) * ref + cos(d) * quad) per CMG
+        """
+        states = np.asarray(states, dtype=float)
+        columns, column = [], 0
+
+        for unit in self.actuators:
+            if unit.kind != 'RW':
+                d = np.deg2rad(states[:, column])
+                h = states[:, column + 1]
+                columns.append(h * (-np.sin(d) * unit.ref[:, None] + np.cos(d) * unit.quad[:, None]))
+            column += len(unit.bounds())
+
+        return np.stack(columns, axis=-1).transpose(1, 0, 2)
+
+    def tables(self, theta, n_h):
+        """
+        Momentum of every actuator over its own state axes, computed once, for
+        the separable grid sum of table_sum.
+
+        Parameters:
+        - theta: Gimbal angle grid (deg)
+        - n_h: Number of momentum levels from 0 to max_H
+
+        Returns:
+        - tables: list of 3xn_i arrays, one per actuator, in the order of its states in grid_states
+        """
+        tables = []
+
+        for unit in self.actuators:
+            axes = [np.asarray(axis, dtype=float) for axis in unit.axes(theta, n_h)]
+            states = grid_states(axes, 0, int(np.prod([len(axis) for axis in axes])))
+            tables.append(unit.momentum(states.T))
+
+        return tables
+
+    def frames(self):
+        """
+        Geometry of the cluster for the analytic support function.
+
+        Returns:
+        - ref, quad: nx3 arrays spanning the momentum circle of every CMG
+        - cmg_H: Length-n array, max. angular momentum of every CMG
+        - wheel_axes: mx3 array, spin axis of every reaction wheel
+        - wheel_H: Length-m array, max. angular momentum of every wheel
+        """
+        cmgs = [unit for unit in self.actuators if unit.kind != 'RW']
+        wheels = [unit for unit in self.actuators if unit.kind == 'RW']
+
+        return (np.array([unit.ref for unit in cmgs]).reshape(-1, 3),
+                np.array([unit.quad for unit in cmgs]).reshape(-1, 3),
+                np.array([unit.max_H for unit in cmgs], dtype=float),
+                np.array([unit.direction() for unit in wheels]).reshape(-1, 3),
+                np.array([unit.max_H for unit in wheels], dtype=float))
+
+
+def grid_states(axes, first, last):
+    """
+    Decode a range of flat state indices of the grid spanned by the axes,
+    in the order of state_grid.
+
+    Parameters:
+    - axes: 1D numpy arrays, one per state variable
+    - first, last: Range of flat state indices
+
+    Returns:
+    - states: (last - first)xK array, one state per row
+    """
+    shape = tuple(len(axis) for axis in axes)
+    index = np.unravel_index(np.arange(first, last, dtype=np.int64), shape)
+
+    return np.stack([axis[sub] for axis, sub in zip(axes, index)], axis=1)
+
+
+def table_block(sizes, chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    Split the actuators of a separable grid into leading ones, whose index
+    combinations are the rows of table_sum, and trailing ones, which span the
+    block written per row. The block is the largest that fits in a chunk.
+
+    Parameters:
+    - sizes: Number of states of every actuator table
+
+    Returns:
+    - split: Number of leading actuators (at least one)
+    - inner: Number of states per row
+    """
+    split = 1
+    while split < len(sizes) - 1 and int(np.prod(sizes[split:], dtype=np.int64)) > chunk_points:
+        split += 1
+
+    return split, int(np.prod(sizes[split:], dtype=np.int64))
+
+
+def table_sum(tables, first=0, last=None, out=None, chunk_points=DEFAULT_CHUNK_POINTS):
+    """
+    Total momentum of a range of grid states from the per-actuator tables of
+    cluster_engine.tables, h_1[:, a] + h_2[:, b] + ..., by broadcast addition.
+
+    No state array and no trigonometry is evaluated per state: the leading
+    actuators are summed per row, and the trailing ones are broadcast-added
+    onto the rows, the last addition writing straight into the output. The
+    points are in the order of grid_states, and the terms are added in actuator
+    order, so they are bit-identical to the kernel.
+
+    Parameters:
+    - tables: list of 3xn_i arrays, one per actuator
+    - first, last: Range of flat state indices (default: the whole grid)
+    - out: Optional 3x(last - first) output array with contiguous rows
+    - chunk_points: Max. number of states per broadcast block
+
+    Returns:
+    - h_total: 3x(last - first) array of angular momentum vectors
+    """
+    sizes = [table.shape[1] for table in tables]
+    total = int(np.prod(sizes, dtype=np.int64))
+    last = total if last is None else min(last, total)
+    out = np.empty((3, last - first)) if out is None else out
+
+    split, inner = table_block(sizes, chunk_points)
+    row_first, row_last = first // inner, -(-last // inner)
+    rows_per_block = max(1, chunk_points // inner)
+
+    for row in range(row_first, row_last, rows_per_block):
+        rows = np.arange(row, min(row + rows_per_block, row_last))
+        low, high = rows[0] * inner, (rows[-1] + 1) * inner
+
+        # Whole rows are written in place, the partial rows at both ends of the range go through a buffer
+        if low >= first and high <= last:
+            _table_rows(tables, sizes, split, rows, out[:, low - first:high - first])
+        else:
+            block = np.empty((3, high - low))
+            _table_rows(tables, sizes, split, rows, block)
+            start, stop = max(low, first), min(high, last)
+            out[:, start - first:stop - first] = block[:, start - low:stop - low]
+
+    return out
+
+
+def _table_rows(tables, sizes, split, rows, target):
+    # Sum of the leading actuators per row, then one broadcast addition per trailing actuator
+    index = np.unravel_index(rows, sizes[:split])
+    partial = tables[0][:, index[0]]
+    for table, sub in zip(tables[1:split], index[1:]):
+        partial = partial + table[:, sub]
+
+    if split == len(tables):
+        target[...] = partial
+        return
+
+    view = target.reshape((3, len(rows)) + tuple(sizes[split:]))
+    for k in range(split, len(tables)):
+        term = tables[k].reshape((3,) + (1,) * (k - split + 1) + (sizes[k],))
+        if k < len(tables) - 1:
+            partial = partial[..., None] + term
+        else:
+            np.add(partial[..., None], term, out=view)
+
+
+def fibonacci_sphere(n):
+    """
+    Nearly uniform unit directions on the sphere (Fibonacci lattice).
+
+    Parameters:
+    - n: Number of directions
+
+    Returns:
+    - directions: 3xn array of unit vectors
+    """
+    index = np.arange(n) + 0.5
+    z = 1 - 2 * index / n
+    rho = np.sqrt(1 - z**2)
+    phi = np.pi * (1 + np.sqrt(5)) * index
+
+    return np.array([rho * np.cos(phi), rho * np.sin(phi), z])
+
+
+def decimate_points(points, budget=None, mode='angular', distances=None):
+    """
+    Reduce a point cloud for plotting while keeping its visual envelope: only
+    the outermost point of every bin is kept.
+
+    Parameters:
+    - points: 3xN numpy array (3D Cartesian coordinates)
+    - budget: Max. number of points kept (None or 0 keeps every point)
+    - mode: 'angular' bins by direction (keeps the outer shell only), 'voxel'
+      bins by position (also keeps the interior visible on the sliced views)
+    - distances: Optional precomputed distance of every point to the origin
+
+    Returns:
+    - reduced: 3xM numpy array, M <= budget, in the original point order
+    - distances: Distance of every kept point to the origin
+    """
+    points = np.asarray(points)
+    distances = np.sqrt(np.einsum('ij,ij->j', points, points)) if distances is None else distances
+
+    if not budget or points.shape[1] <= budget:
+        return points, distances
+
+    if mode == 'voxel':
+        # Cubic voxels over the bounding box; the grid is refined while the occupied voxels fit the budget
+        low = np.min(points, axis=1, keepdims=True)
+        span = np.max(points, axis=1, keepdims=True) - low
+        n = max(1, int(np.floor(budget ** (1 / 3))))
+
+        for _ in range(4):
+            cell = np.minimum(points - low, span) / np.where(span > 0, span, 1) * n
+            cell = np.minimum(cell, n - 1).astype(np.int64)
+            candidate = (cell[0] * n + cell[1]) * n + cell[2]
+            occupied = len(np.unique(candidate))
+            if occupied > budget:
+                break
+            bin_index = candidate
+            n = int(n * 0.95 * (budget / occupied) ** (1 / 3))
+            if occupied > 0.8 * budget:
+                break
+
+    else:
+        # (theta, phi) bins with phi twice as fine as theta, at most budget of them
+        n_theta = max(1, int(np.sqrt(budget / 2)))
+        n_phi = 2 * n_theta
+        theta = np.arccos(np.clip(points[2] / np.where(distances > 0, distances, 1), -1, 1))
+        phi = np.mod(np.arctan2(points[1], points[0]), 2 * np.pi)
+        i = np.minimum((theta / np.pi * n_theta).astype(np.int64), n_theta - 1)
+        j = np.minimum((phi / (2 * np.pi) * n_phi).astype(np.int64), n_phi - 1)
+        bin_index = i * n_phi + j
+
+    # Keep the farthest point of every bin: sort by (bin, distance) and take each bin's last entry
+    order = np.lexsort((distances, bin_index))
+    last = np.append(bin_index[order][1:] != bin_index[order][:-1], True)
+    keep = np.sort(order[last])
+
+    return points[:, keep], distances[keep]
+
+
+class envelope_result:
+    """
+    Point cloud of an envelope in one contiguous 3xN buffer, float64 or float32.
+
+    x, y and z are views of the buffer rows, and the norms, extents and
+    half-space masks are computed on first use and cached, so no coordinate
+    copies are made. A result pickles as its buffer; once exported with
+    to_shared(), it pickles as the name of its shared-memory block instead, and
+    worker processes attach to the points without copying them.
+    """
+
+    def __init__(self, points, dtype=None):
+
+        self.buffer = np.ascontiguousarray(points, dtype=dtype) # 3xN points
+        self.cache = {}                                         # derived quantities, computed on first use
+        self.shared = None                                      # shared-memory block backing the buffer
+        self.owner = False                                      # the block is unlinked by its owner only
+
+    @property
+    def points(self):
+        return self.buffer
+
+    @property
+    def x(self):
+        return self.buffer[0]
+
+    @property
+    def y(self):
+        return self.buffer[1]
+
+    @property
+    def z(self):
+        return self.buffer[2]
+
+    def __len__(self):
+        return self.buffer.shape[1]
+
+    def norms(self):
+        """
+        Returns:
+        - r: Distance of every point to the origin, in the buffer precision
+        """
+        if 'norms' not in self.cache:
+            self.cache['norms'] = np.sqrt(np.einsum('ij,ij->j', self.buffer, self.buffer))
+
+        return self.cache['norms']
+
+    def extents(self):
+        """
+        Returns:
+        - xdim, ydim, zdim: Max. coordinate along every axis
+        """
+        if 'extents' not in self.cache:
+            self.cache['extents'] = tuple(float(value) for value in np.max(self.buffer, axis=1))
+
+        return self.cache['extents']
+
+    def half_space(self, axis, sign=1):
+        """
+        Parameters:
+        - axis: 'x', 'y' or 'z'
+        - sign: 1 for the coordinate > 0 side, -1 for < 0
+
+        Returns:
+        - mask: Boolean array selecting the points strictly beyond the plane, as
+          the sliced plots show them (points on the plane belong to neither side)
+        """
+        key = ('half_space', axis, sign)
+        if key not in self.cache:
+            coordinate = self.buffer['xyz'.index(axis)]
+            self.cache[key] = coordinate > 0 if sign > 0 else coordinate < 0
+
+        return self.cache[key]
+
+    def to_shared(self):
+        """
+        Move the buffer into a shared-memory block (one copy), so that pickling
+        the result for a worker process only sends the block name.
+
+        Returns:
+        - result: self
+        """
+        from multiprocessing import shared_memory
+
+        if self.shared is None:
+            block = shared_memory.SharedMemory(create=True, size=max(1, self.buffer.nbytes))
+            shared = np.ndarray(self.buffer.shape, self.buffer.dtype, buffer=block.buf)
+            shared[...] = self.buffer
+            self.buffer, self.shared, self.owner = shared, block, True
+
+        return self
+
+    @classmethod
+    def attach(cls, name, shape, dtype):
+        """
+        Map the points exported by to_shared() in a worker process, without copying.
+        """
+        from multiprocessing import shared_memory
+
+        block = shared_memory.SharedMemory(name=name)
+        result = cls(np.ndarray(shape, dtype, buffer=block.buf))
+        result.shared = block
+
+        return result
+
+    def close(self):
+        """
+        Release the shared-memory block, if any, and empty the result; the
+        exporting process also frees the block. Views of the points must be
+        dropped first.
+        """
+        if self.shared is not None:
+            self.buffer, self.cache = np.empty((3, 0), self.buffer.dtype), {}
+            self.shared.close()
+            if self.owner:
+                self.shared.unlink()
+            self.shared, self.owner = None, False
+
+    def __reduce__(self):
+        if self.shared is not None:
+            return envelope_result.attach, (self.shared.name, self.buffer.shape, self.buffer.dtype.str)
+
+        return envelope_result, (self.buffer,)
+
+
 class dia_calculator:
 
-    def __init__(self):
+    def __init__(self, settings=None):
 
-        # Initialize parameters
-        self.settings = settings_from_json()
+        # Initialize parameters (from Settings.json unless a settings dict is given)
+        self.settings = settings_from_json() if settings is None else settings
 
         # User-defined step sizes for theta and phi
         self.theta_step = np.pi / self.settings['Wrap Shape N_theta'] # Step size for theta (10 degrees)
@@ -102,71 +848,411 @@ class dia_calculator:
         - phi: Azimuthal angle [0, 2*pi]
         - valid_mask: Boolean array indicating valid (non-zero length) vectors.
         """
-        r = np.sqrt(x**2 + y**2 + z**2) # Radial distance
-        valid_mask = r > epsilon        # Mask for vectors with valid lengths
+        r = np.sqrt(x**2 + y**2 + z**2) # Radial distance
+        valid_mask = r > epsilon        # Mask for vectors with valid lengths
+
+        # Initialize theta and phi
+        theta = np.zeros_like(r)
+        phi = np.zeros_like(r)
+
+        # Only compute theta and phi for valid points
+        theta[valid_mask] = np.arccos(z[valid_mask] / r[valid_mask]) # Polar angle
+        phi[valid_mask] = np.arctan2(y[valid_mask], x[valid_mask])   # Azimuthal angle
+
+        # Ensure phi is in the range [0, 2*pi]
+        phi[valid_mask] = np.where(phi[valid_mask] < 0, phi[valid_mask] + 2 * np.pi, phi[valid_mask])
+
+        # On the Z axis, and just below 2*pi, phi only reflects the rounding of x and y (e.g. -1e-16 vs +0.0):
+        # pin it to 0, so that points equal up to rounding share their bin
+        pinned = valid_mask & ((np.hypot(x, y) <= 1e-12 * r) | (phi >= 2 * np.pi - 1e-12))
+        phi[pinned] = 0.0
+
+        return r, theta, phi
+
+    def bin_edges(self):
+        """
+        Returns:
+        - theta_bins: Bin edges of the polar angle, [0, pi]
+        - phi_bins: Bin edges of the azimuthal angle, [0, 2*pi]
+        """
+        theta_bins = np.arange(0, np.pi + self.theta_step, self.theta_step) # [0, pi]
+        phi_bins = np.arange(0, 2 * np.pi + self.phi_step, self.phi_step)   # [0, 2*pi]
+
+        return theta_bins, phi_bins
+
+    def bin_points(self, points, return_index=False):
+        """
+        Assign every point of a 3D point cloud to its (theta, phi) bin in one pass.
+
+        Parameters:
+        - points: 3xN numpy array (3D Cartesian coordinates)
+        - return_index: Also return the column of every binned point in points
+
+        Returns:
+        - bin_index: Flat index (i * N_phi_bins + j) of the bin of each binned point
+        - r_values: Radial distance of each binned point
+        - shape: Shape of the (theta, phi) bin grid
+        - point_index: Column of each binned point in points (if return_index)
+        """
+        # Convert to spherical coordinates
+        x, y, z = points[0], points[1], points[2]
+        r_values, theta_values, phi_values = self.cartesian_to_spherical(x, y, z)
+
+        # Locate the bins, keeping the [lower, upper) edge convention of the bin grid
+        theta_bins, phi_bins = self.bin_edges()
+        shape = (len(theta_bins) - 1, len(phi_bins) - 1)
+        i = np.searchsorted(theta_bins, theta_values, side='right') - 1
+        j = np.searchsorted(phi_bins, phi_values, side='right') - 1
+
+        # Points beyond the last edge do not belong to any bin
+        in_grid = (i >= 0) & (i < shape[0]) & (j >= 0) & (j < shape[1])
+        bin_index = i[in_grid] * shape[1] + j[in_grid]
+
+        if return_index:
+            return bin_index, r_values[in_grid], shape, np.flatnonzero(in_grid)
+
+        return bin_index, r_values[in_grid], shape
+
+    def process_point_cloud(self, points):
+        """
+        Process a 3D point cloud to find the longest 'r' for each (theta, phi) step
+        and return the shortest 'r' among the R set.
+
+        Parameters:
+        - points: 3xN numpy array (3D Cartesian coordinates)
+
+        Returns:
+        - R_set: 2D array storing the longest r for each (theta, phi) bin
+        - shortest_r: The shortest r in the R set
+        """
+        with stage('process_point_cloud') as record:
+            # Chunks bound the spherical-coordinate temporaries to the chunk size
+            reducer = envelope_reducer(self)
+            for start in range(0, points.shape[1], DEFAULT_CHUNK_POINTS):
+                reducer.update(points[:, start:start + DEFAULT_CHUNK_POINTS])
+
+            R_set = reducer.envelope()
+            shortest_r = reducer.radius()
+            record['points'] = reducer.count
+
+        print(f"Radius of the inscribed sphere: {shortest_r:.4e}")
+        print('')
+
+        return R_set, shortest_r
+
+    def hull_inscribed_sphere(self, points, chunk_points=DEFAULT_CHUNK_POINTS, n_seed=20000):
+        """
+        Exact radius of the inscribed sphere of the point cloud's convex hull, the
+        minimum origin-to-facet distance, independent of the (theta, phi) bins.
+
+        A seed hull built from a strided subsample and the axis extremes bounds the
+        final hull from inside: points closer to the origin than its inscribed
+        radius cannot be hull vertices and are dropped. The remaining points are
+        reduced to hull vertices chunk by chunk before the final hull is built.
+
+        Parameters:
+        - points: 3xN numpy array (3D Cartesian coordinates)
+        - chunk_points: Number of candidate points per intermediate hull
+        - n_seed: Approximate size of the seed subsample
+
+        Returns:
+        - shortest_r: Radius of the inscribed sphere
+        - direction: Unit normal of the closest hull facet
+        """
+        from scipy.spatial import ConvexHull, QhullError
+
+        stride = max(1, points.shape[1] // n_seed)
+        extremes = np.concatenate([np.argmax(points, axis=1), np.argmin(points, axis=1)])
+        seed = np.hstack([points[:, ::stride], points[:, extremes]])
+        seed_radius, _ = facet_inscribed_sphere(ConvexHull(seed.T))
+
+        # Points inside the seed hull's inscribed sphere are interior points
+        candidates = points[:, np.sum(points**2, axis=0) >= seed_radius**2]
+
+        vertices = [seed]
+        for start in range(0, candidates.shape[1], chunk_points):
+            chunk = candidates[:, start:start + chunk_points]
+            if chunk.shape[1] > 3:
+                # A flat or collinear chunk has no 3D hull; its points are kept as they are
+                try:
+                    chunk = chunk[:, ConvexHull(chunk.T).vertices]
+                except QhullError:
+                    pass
+            vertices.append(chunk)
+
+        shortest_r, direction = facet_inscribed_sphere(ConvexHull(np.hstack(vertices).T))
+
+        print(f"Radius of the inscribed sphere (hull facets): {shortest_r:.4e}")
+        print(f"Direction of the closest facet: [{direction[0]:.4f}, {direction[1]:.4f}, {direction[2]:.4f}]")
+        print('')
+
+        return shortest_r, direction
+
+
+def facet_inscribed_sphere(hull):
+    """
+    Radius of the largest origin-centred sphere inside a convex hull.
+
+    Parameters:
+    - hull: scipy.spatial.ConvexHull containing the origin
+
+    Returns:
+    - radius: Minimum origin-to-facet distance
+    - direction: Unit normal of the closest facet
+    """
+    # Facets satisfy n.x + offset <= 0 inside, so the origin is -offset away from each plane
+    distances = -hull.equations[:, 3]
+    closest = np.argmin(distances)
+
+    return distances[closest], hull.equations[closest, :3]
+
+
+class envelope_reducer:
+
+    def __init__(self, calculator=None):
+
+        # Binning rule shared with dia_calculator
+        self.calculator = dia_calculator() if calculator is None else calculator
+
+        theta_bins, phi_bins = self.calculator.bin_edges()
+        self.R_set = np.full((len(theta_bins) - 1, len(phi_bins) - 1), -np.inf)
+        self.count = 0
+
+    def update(self, chunk):
+        """
+        Fold a 3xn chunk of points into the per-(theta, phi) max-r table.
+        """
+        bin_index, r_values, _ = self.calculator.bin_points(chunk)
+        np.maximum.at(self.R_set.reshape(-1), bin_index, r_values)
+        self.count += chunk.shape[1]
+
+    def merge(self, other):
+        """
+        Combine the table of another reducer (e.g. from a parallel worker) into this one.
+        """
+        if other.R_set.shape != self.R_set.shape:
+            raise ValueError('Cannot merge reducers with different (theta, phi) bin grids.')
+
+        np.maximum(self.R_set, other.R_set, out=self.R_set)
+        self.count += other.count
+
+        return self
+
+    def empty_copy(self):
+        """
+        Returns:
+        - reducer: A new, empty reducer with the same bin grid
+        """
+        return envelope_reducer(self.calculator)
+
+    def envelope(self):
+        """
+        Returns:
+        - R_set: Copy of the current longest r for each (theta, phi) bin (-inf for empty bins)
+        """
+        return self.R_set.copy()
+
+    def radius(self):
+        """
+        Returns:
+        - shortest_r: Current radius of the inscribed sphere, the shortest r in the R set
+        """
+        # Find the shortest r in the R set (excluding -inf entries)
+        valid_r = self.R_set[self.R_set > -np.inf]
+
+        if valid_r.size == 0:
+            return np.nan
+
+        return np.min(valid_r)
+
+
+class extent_reducer:
+
+    def __init__(self):
+
+        # Running maximum along each axis
+        self.max_xyz = np.full(3, -np.inf)
+        self.count = 0
+
+    def update(self, chunk):
+        """
+        Fold a 3xn chunk of points into the running axis extents.
+        """
+        if chunk.shape[1] > 0:
+            self.max_xyz = np.maximum(self.max_xyz, np.max(chunk, axis=1))
+            self.count += chunk.shape[1]
+
+    def merge(self, other):
+        """
+        Combine the extents of another reducer (e.g. from a parallel worker) into this one.
+        """
+        np.maximum(self.max_xyz, other.max_xyz, out=self.max_xyz)
+        self.count += other.count
+
+        return self
+
+    def empty_copy(self):
+        """
+        Returns:
+        - reducer: A new, empty extent reducer
+        """
+        return extent_reducer()
+
+    def extents(self):
+        """
+        Returns:
+        - xdim, ydim, zdim: Max. dimension of the envelope along each axis
+        """
+        xdim, ydim, zdim = self.max_xyz
 
-        # Initialize theta and phi
-        theta = np.zeros_like(r)
-        phi = np.zeros_like(r)
+        return xdim, ydim, zdim
 
-        # Only compute theta and phi for valid points
-        theta[valid_mask] = np.arccos(z[valid_mask] / r[valid_mask]) # Polar angle
-        phi[valid_mask] = np.arctan2(y[valid_mask], x[valid_mask])   # Azimuthal angle
 
-        # Ensure phi is in the range [0, 2*pi]
-        phi[valid_mask] = np.where(phi[valid_mask] < 0, phi[valid_mask] + 2 * np.pi, phi[valid_mask])
+class convergence_monitor:
+    """
+    Track how the axis extents and the inscribed sphere radius settle as
+    chunks of points accumulate, to stop a sampled run early.
+
+    The change of a chunk is measured against the values the run had with
+    1/window of its points, not against the previous chunk: the running
+    maxima of a sampled run move in rare steps, with plateaus longer than a
+    doubling of the points, so a per-chunk change falls under any tolerance
+    long before the extents are reached.
+    """
 
-        return r, theta, phi
+    def __init__(self, calculator=None, tol=None, patience=3, window=8):
 
-    def process_point_cloud(self, points):
+        self.extents = extent_reducer()
+        self.envelope = envelope_reducer(calculator)
+        self.tol = tol             # max. relative change counted as settled (None: never stop early)
+        self.patience = patience   # number of consecutive settled chunks required
+        self.window = window       # the change is taken since the run had 1/window of its points
+        self.history = []          # one (points, xdim, ydim, zdim, radius, change) row per chunk
+
+    def update(self, chunk):
         """
-        Process a 3D point cloud to find the longest 'r' for each (theta, phi) step
-        and return the shortest 'r' among the R set.
+        Fold a 3xn chunk of points in and record the new extents and radius.
+        """
+        self.extents.update(chunk)
+        self.envelope.update(chunk)
 
-        Parameters:
-        - points: 3xN numpy array (3D Cartesian coordinates)
-        - theta_step: step size for theta (polar angle)
-        - phi_step: step size for phi (azimuthal angle)
+        values = np.array([*self.extents.extents(), self.envelope.radius()])
+        change = np.nan
 
+        # Latest row with at most 1/window of the points seen so far
+        earlier = [row for row in self.history if self.window * row[0] <= self.extents.count]
+        if earlier:
+            previous = np.array(earlier[-1][1:5])
+            change = np.max(np.abs(values - previous) / np.abs(values))
+
+        self.history.append((self.extents.count, *values, change))
+
+    def converged(self):
+        """
         Returns:
-        - R_set: 2D array storing the longest r for each (theta, phi) bin
-        - shortest_r: The shortest r in the R set
+        - converged: True once the last `patience` chunks each changed every value by
+          less than tol since the run had 1/window of their points
         """
-        # Convert to spherical coordinates
-        x, y, z = points[0], points[1], points[2]
-        r_values, theta_values, phi_values = self.cartesian_to_spherical(x, y, z)
+        if self.tol is None or len(self.history) < self.patience:
+            return False
 
-        # Define theta and phi bins
-        theta_bins = np.arange(0, np.pi + self.theta_step, self.theta_step) # [0, pi]
-        phi_bins = np.arange(0, 2 * np.pi + self.phi_step, self.phi_step)   # [0, 2*pi]
+        return all(row[-1] < self.tol for row in self.history[-self.patience:])
+
+    def report(self):
+        # Print the convergence history
+        print('')
+        print(f"{'Points':>14} {'X-axis':>11} {'Y-axis':>11} {'Z-axis':>11} {'Radius':>11} {'Change':>10}")
+        for points, xdim, ydim, zdim, radius, change in self.history:
+            print(f"{points:>14,d} {xdim:>11.4e} {ydim:>11.4e} {zdim:>11.4e} {radius:>11.4e} {change:>10.2e}")
+        print('')
 
-        # Initialize R_set as a 2D array
-        R_set = np.full((len(theta_bins) - 1, len(phi_bins) - 1), -np.inf)
 
-        # Sweep through the data points using two-layer loops for theta and phi bins
-        for i in range(len(theta_bins) - 1):
-            for j in range(len(phi_bins) - 1):
-                # Find the points that fall within the current theta and phi bin
-                in_bin = (theta_values >= theta_bins[i]) & (theta_values < theta_bins[i+1]) & \
-                        (phi_values >= phi_bins[j]) & (phi_values < phi_bins[j+1])
+class boundary_tracker:
+    """
+    Keep, for every (theta, phi) bin, the n_seeds outermost points seen so far
+    and, for every axis, the farthest point, together with the states that
+    produced them.
+    """
 
-                if np.any(in_bin):                         # If there are points in the bin
-                    R_set[i, j] = np.max(r_values[in_bin]) # Store the longest r in the bin
+    def __init__(self, calculator, n_columns, n_seeds=1):
 
-        # Find the shortest r in the R set (excluding -inf entries)
-        valid_r = R_set[R_set > -np.inf]
-        shortest_r = np.min(valid_r)
+        self.calculator = calculator
+        self.n_seeds = n_seeds
 
-        print(f"Radius of the inscribed sphere: {shortest_r:.4e}")
-        print('')
+        theta_bins, phi_bins = self.calculator.bin_edges()
+        self.n_bins = (len(theta_bins) - 1) * (len(phi_bins) - 1)
+        self.bin_r = np.full((self.n_bins, n_seeds), -np.inf)           # per-bin r, outermost first
+        self.bin_states = np.full((self.n_bins, n_seeds, n_columns), np.nan)
+        self.max_xyz = np.full(3, -np.inf)
+        self.axis_states = np.full((3, n_columns), np.nan)
+        self.bin_count = np.zeros(self.n_bins, dtype=np.int64)          # points seen per bin
+        self.count = 0
+
+    @property
+    def R_set(self):
+        # Flat per-bin max r
+        return self.bin_r[:, 0]
+
+    def update(self, points, states):
+        """
+        Fold a 3xn chunk of points and the nxK states that produced them in.
+        """
+        bin_index, r_values, _, point_index = self.calculator.bin_points(points, return_index=True)
+        self.bin_count += np.bincount(bin_index, minlength=self.n_bins)
+
+        # Pool the kept entries with the new ones; a re-evaluated state gives the same (bin, r) and is kept once
+        filled = self.bin_r > -np.inf
+        bins = np.concatenate([np.nonzero(filled)[0], bin_index])
+        r = np.concatenate([self.bin_r[filled], r_values])
+        pooled = np.concatenate([self.bin_states[filled], states[point_index]])
+        _, unique = np.unique(np.stack([bins, r]), axis=1, return_index=True)
+        bins, r, pooled = bins[unique], r[unique], pooled[unique]
+
+        # The n_seeds outermost entries of every bin
+        order = np.lexsort((-r, bins))
+        bins, r, pooled = bins[order], r[order], pooled[order]
+        rank = np.arange(len(bins)) - np.searchsorted(bins, bins)
+        keep = rank < self.n_seeds
+
+        self.bin_r[:] = -np.inf
+        self.bin_states[:] = np.nan
+        self.bin_r[bins[keep], rank[keep]] = r[keep]
+        self.bin_states[bins[keep], rank[keep]] = pooled[keep]
+
+        if points.shape[1] > 0:
+            best = np.argmax(points, axis=1)
+            better = points[[0, 1, 2], best] > self.max_xyz
+            self.max_xyz[better] = points[better.nonzero()[0], best[better]]
+            self.axis_states[better] = states[best[better]]
+
+        self.count += points.shape[1]
+
+    def values(self):
+        # Per-bin max r and the axis extents, to measure the change between rounds
+        return np.concatenate([self.R_set, self.max_xyz])
+
+    def seeds(self):
+        """
+        Returns:
+        - states: Unique states behind the current outer boundary
+        """
+        states = np.concatenate([self.bin_states.reshape(-1, self.bin_states.shape[2]), self.axis_states])
+        states = states[~np.isnan(states).any(axis=1)]
+
+        return np.unique(states, axis=0)
 
-        return shortest_r
+    def radius(self):
+        # Shortest r in the R set (excluding empty bins)
+        valid_r = self.R_set[self.R_set > -np.inf]
 
+        return np.min(valid_r) if valid_r.size else np.nan
 
-def settings_from_json():
+
+def settings_from_json(path='Settings.json'):
     # Import simulation setting parameters from .json file
+    # (profile_forming and dia_calculator also take a settings dict)
     try:
-        with open('Settings.json', 'r', encoding='utf-8') as file:
+        with open(path, 'r', encoding='utf-8') as file:
             data = json.load(file)
 
     except FileNotFoundError:
@@ -178,10 +1264,10 @@ def settings_from_json():
 
 class profile_forming:
 
-    def __init__(self):
+    def __init__(self, settings=None):
 
-        # Initialize parameters
-        self.settings = settings_from_json()
+        # Initialize parameters (from Settings.json unless a settings dict is given)
+        self.settings = settings_from_json() if settings is None else settings
 
         # Extract the setting data
         self.skew_angle = self.settings['Skew Angle']               # unit: deg
@@ -191,19 +1277,158 @@ class profile_forming:
         self.clu_comb = self.settings['Cluster Combination']
         self.clu_styl = self.settings['Cluster Style']
         self.clu_spd = self.settings['Speed Type']
-
-    def simulation(self):
+        self.workers = self.settings.get('Workers', 1)              # number of worker processes
+        self.symmetry = self.settings.get('Symmetry Reduction', False) # evaluate the fundamental domain only
+        self.sampling = self.settings.get('Sampling', 'grid')           # 'grid', 'sobol', 'halton', 'random'
+        self.sample_budget = self.settings.get('Sample Budget', 2**22)  # number of sampled states
+        self.sample_time = self.settings.get('Sample Time (s)')         # time budget, replaces the budget
+        self.sample_seed = self.settings.get('Sample Seed', 0)
+        self.tolerance = self.settings.get('Convergence Tolerance')     # stop once extents and radius settle
+        self.patience = self.settings.get('Convergence Patience', 3)    # settled chunks required to stop
+        self.window = self.settings.get('Convergence Window', 8)        # change since 1/window of the points
+        self.refine_tol = self.settings.get('Refinement Tolerance', 1e-6)  # 'adaptive': max. relative change
+        self.refine_step = self.settings.get('Refinement Step (deg)', 0.1) # 'adaptive': finest gimbal step
+        self.refine_rounds = self.settings.get('Refinement Rounds', 200)   # 'adaptive': max. number of rounds
+        self.refine_seeds = self.settings.get('Refinement Seeds', 3)       # 'adaptive': states kept per bin
+        self.backend = self.settings.get('Backend', 'batched')             # 'batched' or 'tables' (separable)
+        self.precision = self.settings.get('Point Precision', 'float64')   # result(): 'float64' or 'float32'
+        self.checkpoint = self.settings.get('Checkpoint Directory')        # save and resume the grid here
+        self.checkpoint_interval = self.settings.get('Checkpoint Interval (s)', 60) # min. s between saves
+        self.checkpoint_points = self.settings.get('Checkpoint Points', False) # keep points with reducers
+
+    def setup_grid(self):
 
         # Parameters Setup
-        self.theta = np.linspace(0, 360 - 360 / self.d_theta, self.d_theta - 1)
-        self.h = np.linspace(0, self.max_H, self.d_H)
-        self.N_theta = len(self.theta)
-        self.N_h = len(self.h)
-        self.config = {
-            'Cluster Combination': self.clu_comb, # could be adjacant pair 'adj' or pyramiad cluster 'pyr'
-            'Cluster Style': self.clu_styl,       # could be Conventional Type 'conv' or Hanspeter's Type 'hans'
-            'Speed Type': self.clu_spd
-        }                                           # could be Constant-speed 'CS' or Variable-speed 'VS'
+        with stage('setup_grid'):
+            self.theta = np.linspace(0, 360 - 360 / self.d_theta, self.d_theta - 1)
+            self.h = np.linspace(0, self.max_H, self.d_H)
+            self.N_theta = len(self.theta)
+            self.N_h = len(self.h)
+            self.config = {
+                'Cluster Combination': self.clu_comb, # could be adjacant pair 'adj' or pyramiad cluster 'pyr'
+                'Cluster Style': self.clu_styl,       # could be Conventional Type 'conv' or
+                                                      # Hanspeter's Type 'hans'
+                'Speed Type': self.clu_spd
+            }                                           # could be Constant-speed 'CS' or Variable-speed 'VS'
+
+    def cluster(self):
+        """
+        Returns:
+        - cluster: The cluster_engine of the settings (a preset or the custom 'Actuators')
+        """
+        return cluster_engine.from_settings(self.settings)
+
+    def state_space(self):
+        """
+        Describe the state space of the selected simulator.
+
+        Returns:
+        - axes: list of 1D arrays, one per state variable, in nested-loop order
+        - kernel: batched function mapping an NxK state array to 3xN points
+        """
+        self.setup_grid()
+
+        cluster = self.cluster()
+
+        return cluster.axes(self.theta, self.d_H), cluster.kernel
+
+    def stream(self, chunk_points=None, chunk_bytes=None, start=0, stop=None, progress=True):
+        """
+        Generate the angular momentum points of the selected simulator in
+        fixed-size chunks, in the same order as simulation(). Peak memory is set
+        by the chunk size, not by the size of the grid.
+
+        Parameters:
+        - chunk_points: Number of states evaluated per chunk
+        - chunk_bytes: Approximate working-set budget per chunk (used if chunk_points is None)
+        - start, stop: Range of flat state indices to cover (default: the whole grid)
+        - progress: Show a tqdm progress bar
+
+        Yields:
+        - chunk: 3xn numpy array of angular momentum vectors
+        """
+        axes, kernel = self.state_space()
+        axes = [np.asarray(axis, dtype=float) for axis in axes]
+        shape = tuple(len(axis) for axis in axes)
+        total = int(np.prod(shape, dtype=np.int64))
+        stop = total if stop is None else min(stop, total)
+
+        # Working set per state: indices and state values per axis plus the 3xn result and its temporaries
+        if chunk_points is None:
+            bytes_per_point = 8 * (2 * len(axes) + 4 * 3)
+            chunk_points = chunk_bytes // bytes_per_point if chunk_bytes else DEFAULT_CHUNK_POINTS
+        chunk_points = max(1, int(chunk_points))
+
+        if self.backend == 'tables':
+            # Chunks of whole table_sum rows, so that every chunk is written in place
+            tables = self.cluster().tables(self.theta, self.d_H)
+            _, inner = table_block([table.shape[1] for table in tables], chunk_points)
+            chunk_points = max(inner, chunk_points // inner * inner)
+
+            def evaluate(first, last):
+                return table_sum(tables, first, last, chunk_points=chunk_points)
+
+        else:
+            def evaluate(first, last):
+                return kernel(grid_states(axes, first, last))
+
+        with tqdm(total=stop - start, desc=f"Streaming ({self.clu_comb})", unit='pt', unit_scale=True,
+                  disable=not progress) as bar:
+            for first in range(start, stop, chunk_points):
+                last = min(first + chunk_points, stop)
+                yield evaluate(first, last)
+                bar.update(last - first)
+
+    def simulation(self, reducers=None, chunk_points=None, chunk_bytes=None, workers=None, symmetry=None):
+        """
+        Run the selected simulator.
+
+        Parameters:
+        - reducers: Optional list of objects with an update(chunk) method. When
+          given, the state space is streamed chunk by chunk into every reducer
+          and no point array is kept.
+        - chunk_points, chunk_bytes: Chunk size of the streaming mode (see stream)
+        - workers: Number of worker processes (default: the 'Workers' setting, 1 if absent)
+        - symmetry: Use symmetric_simulation (default: the 'Symmetry Reduction' setting, off if absent)
+
+        With a 'Sampling' setting other than 'grid', adaptive_simulation ('adaptive') or
+        sampled_simulation runs instead and workers and symmetry are ignored, and so
+        they are with a 'Checkpoint Directory' (checkpointed_simulation). With the
+        'tables' backend, the grid is built by table_simulation (or streamed through table_sum).
+
+        Returns:
+        - points, x, y, z: Full point cloud and its coordinate views, or
+        - reducers: The updated reducers when running in streaming mode
+        """
+        workers = self.workers if workers is None else workers
+        symmetry = self.symmetry if symmetry is None else symmetry
+
+        if self.sampling == 'adaptive':
+            return self.adaptive_simulation(reducers, chunk_points)
+
+        if self.sampling != 'grid':
+            return self.sampled_simulation(reducers, chunk_points)
+
+        if self.checkpoint:
+            return self.checkpointed_simulation(reducers, chunk_points, chunk_bytes)
+
+        if symmetry:
+            return self.symmetric_simulation(reducers, chunk_points, chunk_bytes)
+
+        if workers > 1:
+            return self.parallel_simulation(workers, reducers, chunk_points, chunk_bytes)
+
+        if reducers is not None:
+            for chunk in self.stream(chunk_points, chunk_bytes):
+                for reducer in reducers:
+                    reducer.update(chunk)
+
+            return reducers
+
+        if self.backend == 'tables':
+            return self.table_simulation()
+
+        self.setup_grid()
 
         print('')
 
@@ -238,24 +1463,579 @@ class profile_forming:
 
             points, x, y, z = self.pyr_RW()
 
+        elif self.config['Cluster Combination'] == 'custom':
+
+            points, x, y, z = self.custom_cluster()
+
         else:
 
             print('Setting Error. Please select a proper Cluster Style.')
 
         return points, x, y, z
 
+    def result(self, dtype=None):
+        """
+        Run the selected simulator into an envelope_result, one contiguous 3xN
+        buffer in the 'Point Precision'. The 'tables' grid backend writes the
+        points in that precision directly; the other simulators are converted
+        once.
+
+        Parameters:
+        - dtype: Point precision (default: the 'Point Precision' setting, 'float64' if absent)
+
+        Returns:
+        - result: envelope_result
+        """
+        dtype = np.dtype(dtype or self.precision)
+
+        if self.backend == 'tables' and self.sampling == 'grid' and not self.symmetry and self.workers <= 1:
+            return envelope_result(self.table_simulation(dtype=dtype)[0])
+
+        return envelope_result(self.simulation()[0], dtype)
+
+    def sample_stream(self, n_points=None, seconds=None, chunk_points=None, seed=None, method=None,
+                      progress=True):
+        """
+        Generate the angular momentum of states drawn from a low-discrepancy
+        sequence over the gimbal angles and momenta, instead of the tensor grid.
+        The sequence is deterministic given the seed, and its prefix is the same
+        whatever the budget.
+
+        Parameters:
+        - n_points: Number of states to draw (default: 'Sample Budget', unless seconds is given)
+        - seconds: Time budget (default: 'Sample Time (s)'); stops after the chunk that exceeds it
+        - chunk_points: States per chunk, rounded down to a power of 2 (default 2**16)
+        - seed: Seed of the scrambling (default: 'Sample Seed')
+        - method: 'sobol', 'halton' or 'random' (default: 'Sampling')
+        - progress: Show a tqdm progress bar
+
+        Yields:
+        - chunk: 3xn numpy array of angular momentum vectors
+        """
+        method = self.sampling if method is None else method
+        seconds = self.sample_time if seconds is None else seconds
+        n_points = (self.sample_budget if seconds is None else None) if n_points is None else n_points
+        seed = self.sample_seed if seed is None else seed
+
+        self.setup_grid()
+        cluster = self.cluster()
+        low, high = cluster.bounds()
+        varying = high > low
+
+        dims = int(varying.sum())
+
+        if method in ('sobol', 'halton'):
+            from scipy.stats import qmc
+
+        if method == 'sobol':
+            draw = qmc.Sobol(d=dims, scramble=True, seed=seed).random
+
+        elif method == 'halton':
+            draw = qmc.Halton(d=dims, scramble=True, seed=seed).random
+
+        elif method == 'random':
+            generator = np.random.default_rng(seed)
+
+            def draw(n):
+                return generator.random((n, dims))
+
+        else:
+            raise ValueError('Setting Error. Please select a proper sampling method '
+                             '(grid, sobol, halton or random).')
+
+        # Sobol points are balanced over blocks of 2**m points
+        chunk_points = 2**int(np.log2(max(1, chunk_points or 2**16)))
+
+        start, done = time.perf_counter(), 0
+        with tqdm(total=n_points, desc=f"Sampling ({self.clu_comb}, {method})", unit='pt', unit_scale=True,
+                  disable=not progress) as bar:
+            while n_points is None or done < n_points:
+                if seconds is not None and time.perf_counter() - start >= seconds:
+                    break
+
+                n = chunk_points if n_points is None else min(chunk_points, n_points - done)
+                with warnings.catch_warnings():
+                    warnings.filterwarnings('ignore', message='The balance properties')
+                    unit = draw(chunk_points)[:n]
+
+                states = np.empty((n, len(low)))
+                states[:, ~varying] = low[~varying]
+                states[:, varying] = low[varying] + unit * (high - low)[varying]
+
+                yield cluster.kernel(states)
+                done += n
+                bar.update(n)
+
+    def sampled_simulation(self, reducers=None, chunk_points=None):
+        """
+        Run the selected cluster on sampled states (see sample_stream), stopping
+        early once the extents and inscribed radius change by less than
+        'Convergence Tolerance' since the run had 1/'Convergence Window' of
+        the points, for 'Convergence Patience' consecutive chunks. The history
+        is printed and kept in self.convergence.
+
+        Returns:
+        - points, x, y, z: Sampled point cloud and its coordinates as 1D arrays, or
+        - reducers: The updated reducers when reducers are given
+        """
+        monitor = convergence_monitor(dia_calculator(self.settings), self.tolerance, self.patience, self.window)
+        chunks = self.sample_stream(chunk_points=chunk_points)
+        blocks = []
+
+        print('')
+
+        for chunk in chunks:
+            monitor.update(chunk)
+
+            if reducers is None:
+                blocks.append(chunk)
+            else:
+                for reducer in reducers:
+                    reducer.update(chunk)
+
+            if monitor.converged():
+                chunks.close()
+                print(f"Converged after {monitor.extents.count:,d} samples.")
+                break
+
+        monitor.report()
+        self.convergence = monitor.history
+
+        if reducers is not None:
+            return reducers
+
+        points = np.concatenate(blocks, axis=1)
+
+        return points, points[0, :], points[1, :], points[2, :]
+
+    def adaptive_simulation(self, reducers=None, chunk_points=None):
+        """
+        Evaluate the coarse grid of the settings, then refine only around the
+        boundary (compass search): every round moves each state behind one of
+        the 'Refinement Seeds' outermost points of a bin, or behind an axis
+        extent, one step either way along each state column. The step is kept
+        while the per-bin max r and the extents still change by more than
+        'Refinement Tolerance' (relative) and halved otherwise, until the
+        gimbal step reaches 'Refinement Step (deg)'.
+
+        The boundary states are local search seeds, so a bin whose outermost
+        point lies in a basin the coarse grid missed keeps a lower value. The
+        coarse grid is therefore doubled along the gimbal angles until every
+        reached bin holds at least twice 'Refinement Seeds' points (or the next
+        grid would exceed 'Sample Budget'): clusters with few state columns,
+        such as adj, sample the bins sparsely on the grid of the settings.
+
+        Returns:
+        - points, x, y, z: Every evaluated point and its coordinates as 1D arrays, or
+        - reducers: The updated reducers when reducers are given
+        """
+        self.setup_grid()
+        cluster = self.cluster()
+        low, high = cluster.bounds()
+        periodic = cluster.periodic()
+        chunk_points = chunk_points or DEFAULT_CHUNK_POINTS
+
+        def gimbal_axes(d_theta):
+            theta = np.linspace(0, 360 - 360 / d_theta, d_theta - 1)
+            return [np.asarray(axis, dtype=float) for axis in cluster.axes(theta, self.d_H)]
+
+        axes = gimbal_axes(self.d_theta)
+        tracker = boundary_tracker(dia_calculator(self.settings), len(axes), self.refine_seeds)
+        blocks = []
+
+        def evaluate(states):
+            for first in range(0, len(states), chunk_points):
+                part = states[first:first + chunk_points]
+                points = cluster.kernel(part)
+                tracker.update(points, part)
+
+                if reducers is None:
+                    blocks.append(points)
+                else:
+                    for reducer in reducers:
+                        reducer.update(points)
+
+        # Coarse grid, doubled along the gimbal angles while the reached bins are sparsely sampled
+        d_theta = self.d_theta
+        while True:
+            total = int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+            desc = f"Coarse grid ({self.clu_comb}, {d_theta} segments)"
+            for first in tqdm(range(0, total, chunk_points), desc=desc):
+                evaluate(grid_states(axes, first, min(first + chunk_points, total)))
+
+            reached = tracker.bin_count[tracker.bin_count > 0]
+            if not periodic.any() or reached.min() >= 2 * self.refine_seeds:
+                break
+
+            finer = gimbal_axes(2 * d_theta)
+            if tracker.count + np.prod([len(axis) for axis in finer], dtype=np.int64) > self.sample_budget:
+                print(f"Coarse grid kept at {d_theta} segments: a finer one exceeds the 'Sample Budget'")
+                break
+            axes, d_theta = finer, 2 * d_theta
+
+        # Grid spacing of every state column, 0 for fixed columns (a wheel axis [-h, h] is unsorted,
+        # with 0 twice)
+        levels = [np.unique(axis) for axis in axes]
+        step = np.array([values[1] - values[0] if len(values) > 1 else 0.0 for values in levels])
+        angle_step = step[periodic].max() if periodic.any() else 0.0
+        # 'Refinement Step (deg)' of a turn, the same fraction of a momentum range
+        finest = (high - low) * self.refine_step / 360
+
+        print('')
+        print(f"{'Round':>5} {'Gimbal step':>12} {'Points':>14} {'Radius':>11} {'Change':>10}")
+        print(f"{0:>5} {angle_step:>12.4g} {tracker.count:>14,d} {tracker.radius():>11.4e} {'':>10}")
+
+        for round_number in range(1, self.refine_rounds + 1):
+            previous = tracker.values()
+
+            # One step either way along each column, one column at a time
+            moving = np.flatnonzero(step > 0)
+            offsets = np.zeros((2 * len(moving) + 1, len(axes)))
+            offsets[2 * np.arange(len(moving)) + 1, moving] = -step[moving]
+            offsets[2 * np.arange(len(moving)) + 2, moving] = step[moving]
+            candidates = (tracker.seeds()[:, None, :] + offsets[None, :, :]).reshape(-1, len(axes))
+            candidates[:, periodic] %= 360
+            candidates = np.unique(np.clip(candidates, low, high), axis=0)
+            evaluate(candidates)
+
+            values = tracker.values()
+            filled = previous > -np.inf
+            change = np.max(np.abs(values[filled] - previous[filled]) / np.abs(values[filled]), initial=0.0)
+            print(f"{round_number:>5} {angle_step:>12.4g} {tracker.count:>14,d} {tracker.radius():>11.4e} "
+                  f"{change:>10.2e}")
+
+            # Keep the step while the boundary moves, halve it once it has settled
+            if change < self.refine_tol:
+                if np.all(step <= finest):
+                    break
+                step, angle_step = step / 2, angle_step / 2
+
+        print('')
+
+        if reducers is not None:
+            return reducers
+
+        points = np.concatenate(blocks, axis=1)
+
+        return points, points[0, :], points[1, :], points[2, :]
+
+    def parallel_simulation(self, workers, reducers=None, chunk_points=None, chunk_bytes=None):
+        """
+        Split the outer loop of the selected simulator across a process pool.
+
+        Every worker streams its slice of the state space. With reducers, each
+        worker folds its slice into empty copies of them and only the reduced
+        tables are sent back and merged; otherwise the point slices are written
+        back in the same order as the serial simulators.
+
+        Parameters:
+        - workers: Number of worker processes
+        - reducers: Optional list of reducers with update(chunk), merge(other) and empty_copy()
+        - chunk_points, chunk_bytes: Chunk size used inside every worker (see stream)
+
+        Returns:
+        - points, x, y, z, or the merged reducers (same as simulation)
+        """
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+
+        axes, _ = self.state_space()
+        shape = tuple(len(axis) for axis in axes)
+        total = int(np.prod(shape, dtype=np.int64))
+
+        # The outer loop is the first axis with more than one entry (4RW starts with the locked gimbal [90])
+        outer = next((k for k, size in enumerate(shape) if size > 1), len(shape) - 1)
+        slices = int(np.prod(shape[:outer + 1], dtype=np.int64))
+
+        # Tasks are contiguous runs of outer-loop slices, a few per worker for load balancing
+        block = total // slices
+        n_tasks = min(slices, 4 * workers)
+        bounds = np.linspace(0, slices, n_tasks + 1).astype(np.int64) * block
+        templates = None if reducers is None else [reducer.empty_copy() for reducer in reducers]
+
+        points = None if reducers is not None else np.zeros((3, total))
+        partials = [None] * n_tasks
+
+        print('')
+
+        with ProcessPoolExecutor(max_workers=workers) as pool, \
+                tqdm(total=total, desc=f"Processing ({self.clu_comb}, {workers} workers)", unit='pt',
+                     unit_scale=True) as bar:
+            futures = {
+                pool.submit(_simulate_range, self, bounds[k], bounds[k + 1], templates,
+                            chunk_points, chunk_bytes): k
+                for k in range(n_tasks)
+            }
+            for future in as_completed(futures):
+                k = futures[future]
+                if reducers is None:
+                    points[:, bounds[k]:bounds[k + 1]] = future.result()
+                else:
+                    partials[k] = future.result()
+                bar.update(bounds[k + 1] - bounds[k])
+
+        if reducers is not None:
+            for partial in partials:
+                for reducer, part in zip(reducers, partial):
+                    reducer.merge(part)
+
+            return reducers
+
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+    def checkpointed_simulation(self, reducers=None, chunk_points=None, chunk_bytes=None, directory=None):
+        """
+        Stream the grid like simulation(), saving the progress to a directory
+        so that a killed or preempted run resumes from its last completed chunk.
+
+        The directory holds the settings fingerprint and chunk size
+        (checkpoint.json), the state cursor with the pickled reducers
+        (state.pkl, replaced atomically) and, without reducers or with
+        'Checkpoint Points', the point cloud as a memory-mapped points.npy that
+        every chunk is written into. A checkpoint is saved at most every
+        'Checkpoint Interval (s)' and after the last chunk. Chunks are the same
+        in a resumed run, so its result is bit-identical to an uninterrupted one.
+        A checkpoint of other settings is discarded.
+
+        Parameters:
+        - reducers: Optional list of reducers (see simulation); they must be picklable and
+          have a merge method, used to fold a saved checkpoint into them on resume
+        - chunk_points, chunk_bytes: Chunk size (see stream); a resumed run keeps the saved one
+        - directory: Checkpoint directory (default: the 'Checkpoint Directory' setting)
+
+        Returns:
+        - points, x, y, z (points memory-mapped), or the reducers (same as simulation)
+        """
+        directory = directory or self.checkpoint
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, 'checkpoint.json')
+        state_path = os.path.join(directory, 'state.pkl')
+        points_path = os.path.join(directory, 'points.npy')
+
+        axes, _ = self.state_space()
+        total = int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+        keep_points = reducers is None or self.checkpoint_points
+
+        # The checkpoint belongs to the settings that define the grid and the reductions
+        relevant = {name: value for name, value in self.settings.items() if name not in RUNTIME_SETTINGS}
+        fingerprint = hashlib.sha256(json.dumps([relevant, total, keep_points,
+                                                 [type(reducer).__name__ for reducer in reducers or []]],
+                                                sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+        cursor, manifest = 0, None
+        if os.path.isfile(manifest_path) and os.path.isfile(state_path):
+            with open(manifest_path, 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+
+            if manifest['fingerprint'] == fingerprint:
+                with open(state_path, 'rb') as file:
+                    state = pickle.load(file)
+                cursor, chunk_points = state['cursor'], manifest['chunk_points']
+
+                # Fold the saved reductions into the caller's reducers, which keep being the ones filled
+                for reducer, saved in zip(reducers or [], state['reducers'] or []):
+                    reducer.merge(saved)
+                print(f"Resuming from {directory}: {cursor:,d} of {total:,d} states done")
+
+            else:
+                print(f"The checkpoint in {directory} is for other settings, starting over")
+                manifest = None
+
+        if manifest is None:
+            if chunk_points is None:
+                bytes_per_point = 8 * (2 * len(axes) + 4 * 3)
+                chunk_points = chunk_bytes // bytes_per_point if chunk_bytes else DEFAULT_CHUNK_POINTS
+            chunk_points = max(1, int(chunk_points))
+
+            # With the tables backend, stream() rounds the chunks to whole rows; keep its chunk size
+            if self.backend == 'tables':
+                tables = self.cluster().tables(self.theta, self.d_H)
+                _, inner = table_block([table.shape[1] for table in tables], chunk_points)
+                chunk_points = max(inner, chunk_points // inner * inner)
+
+            for path in (state_path, points_path):
+                if os.path.isfile(path):
+                    os.remove(path)
+
+            manifest = {'fingerprint': fingerprint, 'chunk_points': chunk_points, 'total': total,
+                        'settings': relevant}
+            with open(manifest_path, 'w', encoding='utf-8') as file:
+                json.dump(manifest, file, indent=4)
+
+        points = None
+        if keep_points:
+            mode = 'r+' if os.path.isfile(points_path) else 'w+'
+            points = np.lib.format.open_memmap(points_path, mode=mode, dtype=float, shape=(3, total))
+
+        def save(cursor):
+            # Points first, then the cursor: a checkpoint never claims chunks that are not on disk
+            if points is not None:
+                points.flush()
+            with open(state_path + '.tmp', 'wb') as file:
+                pickle.dump({'cursor': cursor, 'reducers': reducers}, file)
+            os.replace(state_path + '.tmp', state_path)
+
+        if cursor == 0:
+            save(0)
+
+        print('')
+
+        saved = time.perf_counter()
+        for chunk in self.stream(chunk_points, start=cursor):
+            if points is not None:
+                points[:, cursor:cursor + chunk.shape[1]] = chunk
+            for reducer in reducers or []:
+                reducer.update(chunk)
+            cursor += chunk.shape[1]
+
+            if cursor == total or time.perf_counter() - saved >= self.checkpoint_interval:
+                save(cursor)
+                saved = time.perf_counter()
+
+        if reducers is not None:
+            return reducers
+
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+    def symmetric_simulation(self, reducers=None, chunk_points=None, chunk_bytes=None):
+        """
+        Evaluate only the fundamental domain of the cluster's symmetry group and
+        rebuild the full point cloud, or feed every group image of the domain to
+        the reducers.
+
+        - pyr (CS/VS) and 4RW: rotating by 90 deg about Z maps CMG #1 -> #2 -> #3 -> #4 -> #1,
+          so H(a, b, c, d) = Rz(90) H(b, c, d, a) for per-CMG state indices a..d. Only
+          states whose first index is the smallest are evaluated (~1/4 of the grid).
+        - 3RW: flipping one wheel flips one axis, so only h >= 0 is evaluated (1/8 of the grid).
+        - adj: the theta grid is not closed under the mirror swapping CMG #1 and #4, so
+          the full grid is evaluated.
+
+        The rebuilt cloud has the brute-force point order and equals it up to the
+        rounding of the summation order. Reducer counts include the duplicates
+        of states that are fixed by a group operation. The domain is evaluated in
+        chunks of chunk_points states (or chunk_bytes, see stream).
+        """
+        self.setup_grid()
+
+        if self.config['Cluster Combination'] in ('pyr', '4RW'):
+            return self._cyclic_simulation(reducers, chunk_points, chunk_bytes)
+
+        elif self.config['Cluster Combination'] == '3RW':
+            return self._octant_simulation(reducers)
+
+        print('No exact symmetry on this gimbal grid, evaluating the full grid.')
+
+        return self.simulation(reducers, symmetry=False)
+
+    def _cyclic_simulation(self, reducers, chunk_points=None, chunk_bytes=None):
+        # Fundamental domain of the 4-fold Z rotation: first per-CMG index is the smallest
+        axes, kernel = self.state_space()
+        angle, momentum = (grid.ravel() for grid in np.meshgrid(axes[0], axes[1], indexing='ij'))
+        M = len(angle) # (angle, momentum) combinations per CMG, in nested-loop order
+
+        if chunk_points is None:
+            chunk_points = chunk_bytes // (8 * (2 * 8 + 4 * 3)) if chunk_bytes else DEFAULT_CHUNK_POINTS
+        chunk_points = max(1, int(chunk_points))
+
+        blocks = []
+        for m in tqdm(range(M), desc=f"Processing it1 ({self.clu_comb}, 1/4 domain)"):
+            size = M - m
+            for first in range(0, size**3, chunk_points):
+                # States (m, j2, j3, j4) with m <= j2, j3, j4, in nested-loop order
+                index = np.arange(first, min(first + chunk_points, size**3))
+                j1 = np.full_like(index, m)
+                j2, j3, j4 = m + index // size**2, m + index // size % size, m + index % size
+                states = np.stack([angle[j1], momentum[j1], angle[j2], momentum[j2],
+                                   angle[j3], momentum[j3], angle[j4], momentum[j4]], axis=1)
+                block = kernel(states)
+
+                if reducers is None:
+                    blocks.append(block)
+                    continue
+
+                for k in range(4):
+                    for reducer in reducers:
+                        reducer.update(_rotate_z90(block, k))
+
+        if reducers is not None:
+            return reducers
+
+        # Rebuild the full cloud in brute-force order: H(t) = Rz^k H(t rotated left by k)
+        domain = np.concatenate(blocks, axis=1)
+        offsets = np.concatenate([[0], np.cumsum((M - np.arange(M))**3)])
+        points = np.empty((3, M**4))
+        inner = [grid.ravel() for grid in np.meshgrid(*[np.arange(M)] * 3, indexing='ij')]
+        columns = np.arange(M**3)
+
+        for a in range(M):
+            t = np.stack([np.full(M**3, a)] + inner)
+            k = np.argmin(t, axis=0) # position of the smallest index
+            t = t[(np.arange(4)[:, None] + k) % 4, columns]
+            m = t[0]
+            size = M - m
+            index = offsets[m] + ((t[1] - m) * size + (t[2] - m)) * size + (t[3] - m)
+            points[:, a * M**3:(a + 1) * M**3] = _rotate_z90(domain[:, index], k)
+
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+    def _octant_simulation(self, reducers):
+        # Fundamental domain of the wheel sign flips: every wheel at h >= 0
+        N = self.N_h
+        domain = tri_ang_vec_batch(state_grid(self.h, self.h, self.h))
+        signs = np.array(list(itertools.product([1, -1], repeat=3))).T
+
+        if reducers is not None:
+            for k in range(signs.shape[1]):
+                for reducer in reducers:
+                    reducer.update(signs[:, k:k + 1] * domain)
+
+            return reducers
+
+        # Rebuild the full cloud in brute-force order over h_range = [-h, h]
+        index = [grid.ravel() for grid in np.meshgrid(*[np.arange(2 * N)] * 3, indexing='ij')]
+        sign = np.array([np.where(k < N, -1.0, 1.0) for k in index])
+        flat = ((index[0] % N) * N + index[1] % N) * N + index[2] % N
+        points = sign * domain[:, flat]
+
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+    def surface_views(self, points):
+        """
+        Reshape a full point cloud of the selected simulator for surface plots,
+        the same way the individual simulators do.
+        """
+        axes, _ = self.state_space()
+
+        # 3RW keeps the points as 1D arrays
+        if self.config['Cluster Combination'] == '3RW':
+            return points[0, :], points[1, :], points[2, :]
+
+        # The first half of the state variables span the columns of the surface grid
+        side = int(np.prod([len(axis) for axis in axes[:len(axes) // 2]]))
+        x = points[0, :].reshape(side, -1).T
+        y = points[1, :].reshape(side, -1).T
+        z = points[2, :].reshape(side, -1).T
+
+        return x, y, z
+
     def adj_CS(self):
 
         points = np.zeros((3, self.N_theta**2))
-        index = 0
+        block = self.N_theta
+        H = [self.max_H]
 
-        # Compute angular momemtum vector points
+        # Compute angular momemtum vector points, one it1 slice per batch
         calculator = ang_vec(self.config['Cluster Style'], self.skew_angle)
-        for it1 in tqdm(self.theta, desc="Processing it1 (adj)"):
-            for it4 in self.theta:
-                state = np.array([it1, self.max_H, it4, self.max_H])
-                points[:, index] = calculator.adj_ang_vec(state)
-                index += 1
+        for index, it1 in enumerate(tqdm(self.theta, desc="Processing it1 (adj)")):
+            states = state_grid([it1], H, self.theta, H)
+            points[:, index * block:(index + 1) * block] = calculator.adj_ang_vec_batch(states)
 
         # Reshape points for surface plot
         x = points[0, :].reshape(self.N_theta, self.N_theta).T
@@ -267,17 +2047,16 @@ class profile_forming:
     def adj_VS(self):
 
         points = np.zeros((3, (self.N_theta**2) * (self.N_h**2)))
+        block = self.N_theta * self.N_h
         index = 0
 
-        # Compute angular momemtum vector points
+        # Compute angular momemtum vector points, one (it1, h1) slice per batch
         calculator = ang_vec(self.config['Cluster Style'], self.skew_angle)
         for it1 in tqdm(self.theta, desc="Processing it1 (adj)"):
             for h1 in self.h:
-                for it4 in self.theta:
-                    for h4 in self.h:
-                        state = np.array([it1, h1, it4, h4])
-                        points[:, index] = calculator.adj_ang_vec(state)
-                        index += 1
+                states = state_grid([it1], [h1], self.theta, self.h)
+                points[:, index:index + block] = calculator.adj_ang_vec_batch(states)
+                index += block
 
         # Reshape points for surface plot
         x = points[0, :].reshape(self.N_theta * self.N_h, self.N_theta * self.N_h).T
@@ -289,17 +2068,14 @@ class profile_forming:
     def pyr_CS(self):
 
         points = np.zeros((3, self.N_theta**4))
-        index = 0
+        block = self.N_theta**3
+        H = [self.max_H]
 
-        # Compute angular momemtum vector points
+        # Compute angular momemtum vector points, one it1 slice per batch
         calculator = ang_vec(self.config['Cluster Style'], self.skew_angle)
-        for it1 in tqdm(self.theta, desc="Processing it1 (pyr)"):
-            for it2 in self.theta:
-                for it3 in self.theta:
-                    for it4 in self.theta:
-                        state = np.array([it1, self.max_H, it2, self.max_H, it3, self.max_H, it4, self.max_H])
-                        points[:, index] = calculator.pyr_ang_vec(state)
-                        index += 1
+        for index, it1 in enumerate(tqdm(self.theta, desc="Processing it1 (pyr)")):
+            states = state_grid([it1], H, self.theta, H, self.theta, H, self.theta, H)
+            points[:, index * block:(index + 1) * block] = calculator.pyr_ang_vec_batch(states)
 
         # Reshape points for surface plot
         x = points[0, :].reshape(self.N_theta**2, self.N_theta**2).T
@@ -311,21 +2087,16 @@ class profile_forming:
     def pyr_VS(self):
 
         points = np.zeros((3, (self.N_theta**4) * (self.N_h**4)))
+        block = (self.N_theta * self.N_h)**3
         index = 0
 
-        # Compute angular momemtum vector points
+        # Compute angular momemtum vector points, one (it1, h1) slice per batch
         calculator = ang_vec(self.config['Cluster Style'], self.skew_angle)
         for it1 in tqdm(self.theta, desc="Processing it1 (pyr)"):
             for h1 in tqdm(self.h, desc="Processing h1 (pyr)"):
-                for it2 in self.theta:
-                    for h2 in self.h:
-                        for it3 in self.theta:
-                            for h3 in self.h:
-                                for it4 in self.theta:
-                                    for h4 in self.h:
-                                        state = np.array([it1, h1, it2, h2, it3, h3, it4, h4])
-                                        points[:, index] = calculator.pyr_ang_vec(state)
-                                        index += 1
+                states = state_grid([it1], [h1], self.theta, self.h, self.theta, self.h, self.theta, self.h)
+                points[:, index:index + block] = calculator.pyr_ang_vec_batch(states)
+                index += block
 
         # Reshape points for surface plot
         x = points[0, :].reshape((self.N_theta**2) * (self.N_h**2), (self.N_theta**2) * (self.N_h**2)).T
@@ -338,22 +2109,19 @@ class profile_forming:
 
         self.N_h = 2 * self.N_h
         points = np.zeros((3, self.N_h**3))
-        index = 0
+        block = self.N_h**2
 
         # Compute angular momentum vector points
         h_range = np.concatenate([-self.h, self.h]) # Combine negative and positive ranges
 
-        for h1 in tqdm(h_range, desc="Processing h1 (pyr)"):
-            for h2 in h_range:
-                for h3 in h_range:
-                    state = np.array([h1, h2, h3])
-                    points[:, index] = tri_ang_vec(state)
-                    index += 1
+        for index, h1 in enumerate(tqdm(h_range, desc="Processing h1 (pyr)")):
+            states = state_grid([h1], h_range, h_range)
+            points[:, index * block:(index + 1) * block] = tri_ang_vec_batch(states)
 
-                # Extract x, y, z as 1D arrays
-                x = points[0, :]
-                y = points[1, :]
-                z = points[2, :]
+        # Extract x, y, z as 1D arrays
+        x = points[0, :]
+        y = points[1, :]
+        z = points[2, :]
 
         return points, x, y, z
 
@@ -361,20 +2129,16 @@ class profile_forming:
 
         self.N_h = 2 * self.N_h
         points = np.zeros((3, self.N_h**4))
-        index = 0
+        block = self.N_h**3
 
         # Compute angular momentum vector points
         h_range = np.concatenate([-self.h, self.h]) # Combine negative and positive ranges
 
-        # Compute angular momemtum vector points
+        # Compute angular momemtum vector points, one h1 slice per batch
         calculator = ang_vec('hans', self.skew_angle)
-        for h1 in tqdm(h_range, desc="Processing h1 (pyr)"):
-            for h2 in h_range:
-                for h3 in h_range:
-                    for h4 in h_range:
-                        state = np.array([90, h1, 90, h2, 90, h3, 90, h4])
-                        points[:, index] = calculator.pyr_ang_vec(state)
-                        index += 1
+        for index, h1 in enumerate(tqdm(h_range, desc="Processing h1 (pyr)")):
+            states = state_grid([90], [h1], [90], h_range, [90], h_range, [90], h_range)
+            points[:, index * block:(index + 1) * block] = calculator.pyr_ang_vec_batch(states)
 
         # Reshape points for surface plot
         x = points[0, :].reshape(self.N_h**2, self.N_h**2).T
@@ -383,10 +2147,80 @@ class profile_forming:
 
         return points, x, y, z
 
+    def table_simulation(self, chunk_points=None, dtype=float):
+        """
+        Grid simulation with the 'tables' backend: the momentum of every actuator
+        is tabulated once over its own (gimbal angle, momentum) states, and the
+        full cloud is built by broadcast addition of the tables straight into
+        the preallocated point array (see table_sum). Same points, in the same
+        order, as the nested-loop simulators (zero components at h = 0 may
+        differ in sign).
+
+        Parameters:
+        - chunk_points: Max. number of states per broadcast block
+        - dtype: Precision of the point array, written directly (float32 halves it)
+
+        Returns:
+        - points, x, y, z: Full point cloud and its surface views
+        """
+        axes, _ = self.state_space()
+        tables = self.cluster().tables(self.theta, self.d_H)
+        total = int(np.prod([len(axis) for axis in axes], dtype=np.int64))
+
+        # Blocks of whole table_sum rows
+        _, inner = table_block([table.shape[1] for table in tables], chunk_points or DEFAULT_CHUNK_POINTS)
+        block = max(inner, (chunk_points or DEFAULT_CHUNK_POINTS) // inner * inner)
+
+        points = np.empty((3, total), dtype)
+
+        print('')
+
+        for first in tqdm(range(0, total, block), desc=f"Processing tables ({self.clu_comb})"):
+            last = min(first + block, total)
+            table_sum(tables, first, last, points[:, first:last], block)
+
+        # Reshape points for surface plot
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+    def custom_cluster(self):
+
+        # Compute angular momentum vector points of the 'Actuators' list, one chunk per batch
+        points = np.concatenate(list(self.stream()), axis=1)
+
+        # Reshape points for surface plot
+        x, y, z = self.surface_views(points)
+
+        return points, x, y, z
+
+
+def _rotate_z90(points, k):
+    # Rotate 3xN points by k * 90 deg about Z (k scalar or per point), exactly
+    c = np.array([1, 0, -1, 0])[k % 4]
+    s = np.array([0, 1, 0, -1])[k % 4]
+
+    return np.array([c * points[0] - s * points[1], s * points[0] + c * points[1], points[2]])
+
+
+def _simulate_range(calculation, start, stop, reducers, chunk_points, chunk_bytes):
+    # Worker task of profile_forming.parallel_simulation
+    chunks = calculation.stream(chunk_points, chunk_bytes, start, stop, progress=False)
+
+    if reducers is None:
+        return np.concatenate(list(chunks), axis=1)
+
+    for chunk in chunks:
+        for reducer in reducers:
+            reducer.update(chunk)
+
+    return reducers
+
 
 # Plot closing function
 def close_figure(event):
     if event.key == 'escape':
+        import matplotlib.pyplot as plt
         plt.close(event.canvas.figure)
 
 
@@ -520,3 +2354,141 @@ def add_boundary_to_plane(ax, radius, width, length, axis, num_points=100):
         linewidth=2,
         zorder=5,      # Higher zorder to show above scatter points
         label=f'Inscribed Sphere (radius={radius:.2e}) Nms')
+
+
+def scientific_formatter():
+    import matplotlib.ticker as ticker
+
+    # Configure axes to use scientific notation
+    formatter = ticker.ScalarFormatter(useMathText=True)
+    formatter.set_scientific(True)     # Enable scientific notation
+    formatter.set_powerlimits((-2, 2)) # Adjust range for scientific notation
+
+    return formatter
+
+
+def plot_full_envelope(fig, plot_points, distances, max_range, mesh=None):
+    """
+    Draw the full angular momentum envelope.
+
+    Parameters:
+        fig: The figure to draw on.
+        plot_points: 3xN points to scatter.
+        distances: Distance of every point to the origin (colour scale).
+        max_range: Half-width of the 1:1:1 axes box.
+        mesh: Optional (vertices Mx3, triangles Fx3) hull surface drawn under the points.
+    """
+    x_plot, y_plot, z_plot = plot_points
+
+    # Plot Settings
+    ax0 = fig.add_subplot(111, projection='3d')
+    scatter = ax0.scatter(x_plot, y_plot, z_plot, c=distances, cmap='coolwarm', edgecolor='none', alpha=0.6)
+
+    # Draw the hull surface under the vertices
+    if mesh is not None:
+        hull_points, faces = mesh
+        ax0.plot_trisurf(hull_points[:, 0], hull_points[:, 1], hull_points[:, 2], triangles=faces,
+                         color='grey', edgecolor='none', alpha=0.2)
+    ax0.set_title("Angular Momentum Envelope", fontsize=14, pad=20) # Add padding to the title
+
+    # Set axes labels with additional padding
+    ax0.set_xlabel('X-axis (Nms)', fontsize=12, labelpad=20)
+    ax0.set_ylabel('Y-axis (Nms)', fontsize=12, labelpad=20)
+    ax0.set_zlabel('Z-axis (Nms)', fontsize=12, labelpad=20)
+
+    # Configure axes to use scientific notation
+    formatter = scientific_formatter()
+    ax0.xaxis.set_major_formatter(formatter)
+    ax0.yaxis.set_major_formatter(formatter)
+    ax0.zaxis.set_major_formatter(formatter)
+
+    # Keep the scales for three axes to be 1:1:1
+    ax0.set_xlim(-max_range, max_range)
+    ax0.set_ylim(-max_range, max_range)
+    ax0.set_zlim(-max_range, max_range)
+    ax0.set_aspect('equal')
+
+    # Add colorbar to show the distance mapping and adjust its position
+    colorbar = fig.colorbar(scatter, ax=ax0, shrink=0.5, aspect=10, pad=0.2) # Increase `pad` for separation
+    colorbar.set_label('Distance to Origin (Nms)', fontsize=12, labelpad=10)
+
+    # Configure colorbar ticks with scientific notation
+    colorbar.formatter = formatter
+    colorbar.update_ticks()
+
+    # Adjust the subplot margins to prevent overlaps
+    fig.subplots_adjust(left=0.2, right=0.8, top=0.85, bottom=0.15)
+
+
+def plot_sliced_envelope(fig, axis, plot_points, distances, radius, dims, max_range):
+    """
+    Draw the half of the envelope beyond the YZ/XZ/XY plane, with the inscribed
+    sphere and the max. boundary in that plane.
+
+    Parameters:
+        fig: The figure to draw on.
+        axis: 'x', 'y' or 'z', the axis normal to the slicing plane.
+        plot_points: envelope_result of the (decimated) points of the full envelope.
+        distances: Distance of every point to the origin (colour scale).
+        radius: Radius of the inscribed sphere.
+        dims: (xdim, ydim, zdim) max. dimensions of the envelope.
+        max_range: Half-width of the 1:1:1 axes box.
+    """
+    xdim, ydim, zdim = dims
+
+    # Slice view per axis: view angle, rectangle width and length
+    slices = {
+        'x': ((10, 135), ydim * 2, zdim * 2),
+        'y': ((10, -45), zdim * 2, xdim * 2),
+        'z': ((190, 135), xdim * 2, ydim * 2)
+    }
+    view, width, length = slices[axis]
+
+    # Mask and flatten arrays: only keep points on the positive side of the plane
+    sliced = plot_points.half_space(axis)
+    x_valid, y_valid, z_valid = plot_points.points[:, sliced]
+    distances_valid = distances[sliced]
+
+    # Plot Settings
+    ax = fig.add_subplot(111, projection='3d')
+    scatter = ax.scatter(x_valid, y_valid, z_valid, c=distances_valid, cmap='coolwarm', edgecolor='none',
+                         alpha=0.6)
+    ax.set_title(f"3D Surface Plot with Slicing on {axis.upper()}=0", fontsize=14,
+                 pad=20) # Add padding to the title
+
+    # Set axes labels with padding
+    ax.set_xlabel('X-axis (Nms)', fontsize=12, labelpad=20)
+    ax.set_ylabel('Y-axis (Nms)', fontsize=12, labelpad=20)
+    ax.set_zlabel('Z-axis (Nms)', fontsize=12, labelpad=20)
+
+    # Set axes limits and appearance
+    ax.view_init(*view) # Adjust the viewing angle
+
+    # Configure axes to auto-adjust limits and use scientific notation for ticks
+    formatter = scientific_formatter()
+    ax.xaxis.set_major_formatter(formatter)
+    ax.yaxis.set_major_formatter(formatter)
+    ax.zaxis.set_major_formatter(formatter)
+
+    # Keep the scales for three axes to be 1:1:1
+    ax.set_xlim(-max_range, max_range)
+    ax.set_ylim(-max_range, max_range)
+    ax.set_zlim(-max_range, max_range)
+    ax.set_aspect('equal')
+
+    # Add colorbar with adjusted padding
+    colorbar = fig.colorbar(scatter, ax=ax, shrink=0.5, aspect=10, pad=0.2)
+    colorbar.set_label('Distance to Origin (Nms)', fontsize=12, labelpad=10)
+
+    # Configure colorbar ticks with scientific notation
+    colorbar.formatter = formatter
+    colorbar.update_ticks()
+
+    # Add the circle to the slicing plane
+    add_boundary_to_plane(ax, radius, width, length, axis)
+
+    # Add a legend to identify the circle
+    ax.legend(loc='upper left')
+
+    # Adjust subplot margins to prevent overlaps
+    fig.subplots_adjust(left=0.2, right=0.8, top=0.85, bottom=0.15)
@@ -0,0 +1,171 @@
+import contextlib
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Set to a file name to trace a run from its very first stage (before Settings.json is read)
+TRACE_ENVIRONMENT = 'ENVELOPE_TRACE'
+
+# Returned by stage() while tracing is off: no timer, no allocation, nothing recorded
+_DISABLED = contextlib.nullcontext({})
+
+# Active tracer, None while tracing is off
+_tracer = None
+
+
+class stage_tracer:
+    """
+    Record the wall time, CPU time, points processed and (optionally) peak
+    allocation of nested run stages, and write them as a Chrome trace-event
+    file (chrome://tracing, https://ui.perfetto.dev).
+    """
+
+    def __init__(self, path, memory=False, profile=None):
+
+        self.path = path        # trace-event JSON file
+        self.memory = memory    # track peak allocations with tracemalloc (slows allocation-heavy stages)
+        self.profile = profile  # optional cProfile .prof file covering the whole trace
+        self.events = []
+        self.stack = []
+        self.epoch = time.perf_counter_ns()
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self.profiler = None
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name, **args):
+        """
+        Time the enclosed block as one stage. The yielded dict is stored with the
+        stage; set record['points'] to report the number of points processed.
+        """
+        record = dict(args)
+        parent = self.stack[-1] if self.stack else None
+
+        if self.memory:
+            # Fold the parent's peak so far into it before the peak is reset for this stage
+            if parent is not None and 'start_memory' in parent:
+                parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            frame = {'peak': 0, 'start_memory': tracemalloc.get_traced_memory()[0]}
+        else:
+            frame = {'peak': 0}
+        self.stack.append(frame)
+
+        start, cpu_start = time.perf_counter_ns(), time.process_time()
+        try:
+            yield record
+        finally:
+            duration, cpu = time.perf_counter_ns() - start, time.process_time() - cpu_start
+            self.stack.pop()
+
+            if self.memory and 'start_memory' in frame:
+                frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_alloc_mb'] = (frame['peak'] - frame['start_memory']) / 2**20
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], frame['peak'])
+
+            record['cpu_s'] = cpu
+            self.events.append({
+                'name': name,
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': (start - self.epoch) / 1000, # trace events are in microseconds
+                'dur': duration / 1000,
+                'pid': os.getpid(),
+                'tid': threading.get_ident(),
+                'args': record
+            })
+
+    def write(self):
+        """
+        Write the trace-event file (and the cProfile stats) and print a per-stage summary.
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile)
+
+        if self.memory:
+            tracemalloc.stop()
+
+        events = sorted(self.events, key=lambda event: event['ts'])
+        with open(self.path, 'w', encoding='utf-8') as file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file, indent=1)
+
+        print('')
+        print(f"{'Stage':<28} {'Wall (s)':>10} {'CPU (s)':>10} {'Points':>14} {'Peak (MB)':>10}")
+        for event in events:
+            args = event['args']
+            points = f"{args['points']:,d}" if 'points' in args else '-'
+            peak = f"{args['peak_alloc_mb']:.1f}" if 'peak_alloc_mb' in args else '-'
+            wall, cpu = event['dur'] / 1e6, args['cpu_s']
+            print(f"{event['name']:<28} {wall:>10.3f} {cpu:>10.3f} {points:>14} {peak:>10}")
+        print(f"Trace written to {self.path}")
+        print('')
+
+
+def stage(name, **args):
+    """
+    Context manager timing one stage of the active trace; a no-op while tracing is off.
+
+    Usage:
+        with stage('simulation') as record:
+            points = ...
+            record['points'] = points.shape[1]
+    """
+    if _tracer is None:
+        return _DISABLED
+
+    return _tracer.stage(name, **args)
+
+
+def start_tracing(settings=None):
+    """
+    Turn tracing on from the 'Trace File', 'Trace Memory' and 'Trace Profile'
+    settings (or the ENVELOPE_TRACE environment variable). Tracing already
+    running is kept.
+
+    Returns:
+    - tracer: The active stage_tracer, or None when tracing is off
+    """
+    global _tracer
+
+    if _tracer is None:
+        settings = settings or {}
+        path = settings.get('Trace File') or os.environ.get(TRACE_ENVIRONMENT)
+        if path:
+            _tracer = stage_tracer(path, settings.get('Trace Memory', False), settings.get('Trace Profile'))
+
+    elif settings:
+        # Settings read after an ENVELOPE_TRACE start can still add the optional captures
+        if settings.get('Trace Memory', False) and not _tracer.memory:
+            _tracer.memory = True
+            tracemalloc.start()
+        if settings.get('Trace Profile') and _tracer.profiler is None:
+            _tracer.profile = settings['Trace Profile']
+            _tracer.profiler = cProfile.Profile()
+            _tracer.profiler.enable()
+
+    return _tracer
+
+
+def finish_tracing():
+    """
+    Write the active trace, if any, and turn tracing off.
+    """
+    global _tracer
+
+    if _tracer is not None:
+        _tracer.write()
+        _tracer = None
+
+
+# Trace from import time when requested through the environment
+start_tracing()
@@ -0,0 +1,62 @@
+import io
+import contextlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+os.environ['TQDM_DISABLE'] = '1'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Angular_Momumtum_Envelop_Toolkit import dia_calculator, envelope_reducer, extent_reducer, profile_forming
+
+# Small grids: the pyr case puts points on the Z axis, where the azimuth is rounding noise
+CASES = [
+    {'Cluster Combination': 'pyr', 'Speed Type': 'CS', 'Skew Angle': 40, 'No. of Delta Theta Segment': 9,
+     'No. of Delta H Segment': 2},
+    {'Cluster Combination': 'pyr', 'Speed Type': 'VS', 'Skew Angle': 53.13, 'No. of Delta Theta Segment': 5,
+     'No. of Delta H Segment': 3},
+    {'Cluster Combination': '4RW', 'Speed Type': 'CS', 'Skew Angle': 53.13, 'No. of Delta Theta Segment': 9,
+     'No. of Delta H Segment': 5},
+    {'Cluster Combination': '3RW', 'Speed Type': 'CS', 'Skew Angle': 53.13, 'No. of Delta Theta Segment': 9,
+     'No. of Delta H Segment': 6}
+]
+
+
+def settings_of(case):
+    settings = {'Max. Angular Momemtum per CMG': 1, 'Cluster Style': 'conv', 'Wrap Shape N_theta': 9,
+                'Wrap Shape N_phi': 15}
+    settings.update(case)
+
+    return settings
+
+
+def run(settings, symmetry, reducers=None, chunk_points=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return profile_forming(settings).simulation(reducers, chunk_points=chunk_points, symmetry=symmetry)
+
+
+@pytest.mark.parametrize('case', CASES, ids=lambda case: f"{case['Cluster Combination']}_{case['Speed Type']}")
+def test_symmetric_cloud_matches_brute_force(case):
+    settings = settings_of(case)
+    full, _, _, _ = run(settings, symmetry=False)
+    symmetric, _, _, _ = run(settings, symmetry=True)
+
+    np.testing.assert_allclose(symmetric, full, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('case', CASES, ids=lambda case: f"{case['Cluster Combination']}_{case['Speed Type']}")
+def test_symmetric_reducers_match_brute_force(case):
+    settings = settings_of(case)
+    full, _, _, _ = run(settings, symmetry=False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, radius = dia_calculator(settings).process_point_cloud(full)
+
+    # Chunks smaller than one domain block
+    envelope, extents = envelope_reducer(dia_calculator(settings)), extent_reducer()
+    run(settings, symmetry=True, reducers=[envelope, extents], chunk_points=97)
+
+    assert envelope.radius() == pytest.approx(radius, rel=1e-12)
+    np.testing.assert_allclose(extents.extents(), np.max(full, axis=1), rtol=1e-12)